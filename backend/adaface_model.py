@@ -1,9 +1,10 @@
 # backend/adaface_model.py - FINAL WORKING VERSION
 import torch
 import cv2
+import hashlib
+import json
 import numpy as np
 import os
-from torchvision import transforms
 
 # This is now a simple, direct import because net.py is in the same folder.
 # This solves the "attempted relative import" error.
@@ -18,17 +19,113 @@ except ImportError as e:
     raise e
 
 
+INPUT_SIZE = 112
+BACKENDS = ("torch", "onnxruntime")
+# Max absolute difference allowed between the torch and ONNX Runtime embeddings
+ONNX_TOLERANCE = 1e-3
+
+
+def export_onnx(model, onnx_path, opset=17):
+    """Exports IR-101 to ONNX with a dynamic batch axis. Outputs are (embedding, norm) like the torch model."""
+    model = model.cpu().eval()
+    dummy_input = torch.randn(2, 3, INPUT_SIZE, INPUT_SIZE)
+    tmp_path = f"{onnx_path}.tmp"
+    torch.onnx.export(
+        model, dummy_input, tmp_path,
+        input_names=["input"], output_names=["embedding", "norm"],
+        dynamic_axes={"input": {0: "batch"}, "embedding": {0: "batch"}, "norm": {0: "batch"}},
+        opset_version=opset, dynamo=False,
+    )
+    os.replace(tmp_path, onnx_path)
+
+
+def _source_path(onnx_path):
+    # Records which checkpoint an ONNX export was made from
+    return f"{onnx_path}.source.json"
+
+
+def checkpoint_sha256(checkpoint_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(checkpoint_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def record_onnx_source(onnx_path, checkpoint_path):
+    stat = os.stat(checkpoint_path)
+    with open(_source_path(onnx_path), "w") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": checkpoint_sha256(checkpoint_path)}, f)
+
+
+def onnx_matches_checkpoint(onnx_path, checkpoint_path):
+    """
+    True when the export was made from this checkpoint. Same size and mtime is taken as a
+    match; otherwise the checkpoint is hashed, so a copied or touched file is not re-exported.
+    """
+    try:
+        with open(_source_path(onnx_path)) as f:
+            source = json.load(f)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(checkpoint_path)
+    if source.get("size") != stat.st_size:
+        return False
+    if source.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    return source.get("sha256") == checkpoint_sha256(checkpoint_path)
+
+
+def create_onnx_session(onnx_path):
+    """CPU session tuned for one large convolutional graph (ORT_INTRA_OP_THREADS / ORT_INTER_OP_THREADS)."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # IR-101 is a straight chain of ops, so parallelism belongs inside each op, not across ops
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = int(os.getenv("ORT_INTRA_OP_THREADS", os.cpu_count() or 1))
+    options.inter_op_num_threads = int(os.getenv("ORT_INTER_OP_THREADS", 1))
+    return ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def validate_onnx(model, session, batch_size=4):
+    """Runs the same random batch through both paths and returns the max absolute embedding difference."""
+    sample = np.random.default_rng(0).uniform(-1, 1, (batch_size, 3, INPUT_SIZE, INPUT_SIZE)).astype(np.float32)
+    with torch.inference_mode():
+        torch_embeddings, _ = model.cpu().eval()(torch.from_numpy(sample))
+    onnx_embeddings = session.run(["embedding"], {"input": sample})[0]
+    return float(np.abs(torch_embeddings.numpy() - onnx_embeddings).max())
+
+
 class AdaFaceModel:
-    def __init__(self, model_path, use_gpu=True):
+    def __init__(self, model_path, use_gpu=True, batch_size=None, backend=None):
         """
         Initializes the AdaFace model.
+        batch_size caps how many crops go through IR-101 in one forward pass (ADAFACE_BATCH_SIZE).
+        backend is "torch" or "onnxruntime" (ADAFACE_BACKEND). The ONNX model lives next to the
+        checkpoint and is exported and validated against torch the first time it is needed, and
+        again whenever the checkpoint changes.
         """
-        if not os.path.exists(model_path):
+        self.backend = backend or os.getenv("ADAFACE_BACKEND", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown AdaFace backend '{self.backend}', expected one of {BACKENDS}")
+        self.onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+        if not os.path.exists(model_path) and not (self.backend == "onnxruntime" and os.path.exists(self.onnx_path)):
             raise FileNotFoundError(f"AdaFace model not found at path: {model_path}")
-            
+
         self.device = torch.device('cuda' if use_gpu and torch.cuda.is_available() else 'cpu')
-        print(f"AdaFace is using device: {self.device}")
-        
+        self.batch_size = batch_size or int(os.getenv("ADAFACE_BATCH_SIZE", 32))
+        self.model = None
+        self.session = None
+
+        if self.backend == "onnxruntime":
+            self._load_onnx(model_path)
+        else:
+            print(f"AdaFace is using device: {self.device}")
+            self._load_torch(model_path)
+
+    def _load_torch(self, model_path):
         # The model requires an input_size argument.
         self.model = IR_101(input_size=(112, 112))
         self.model.to(self.device)
@@ -43,7 +140,7 @@ class AdaFaceModel:
             else:
                 # If not, assume the file itself is the state_dict
                 state_dict = checkpoint
-            
+
             # The keys in the official checkpoint have a "model." prefix, which we need to remove.
             model_state_dict = {key.replace('model.', ''): val for key, val in state_dict.items()}
             self.model.load_state_dict(model_state_dict, strict=False)
@@ -51,31 +148,82 @@ class AdaFaceModel:
         except Exception as e:
             print(f"Error loading AdaFace model: {e}")
             raise e
-            
+
         self.model.eval()
 
-        # Define Image Preprocessing
-        self.transform = transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]),
+    def _load_onnx(self, model_path):
+        # Without the checkpoint there is nothing to compare against, so a shipped export is used as is
+        if os.path.exists(self.onnx_path) and (not os.path.exists(model_path)
+                                               or onnx_matches_checkpoint(self.onnx_path, model_path)):
+            self.session = create_onnx_session(self.onnx_path)
+            print(f"AdaFace ONNX model loaded from {self.onnx_path}")
+            return
+        if os.path.exists(self.onnx_path):
+            print(f"AdaFace ONNX model at {self.onnx_path} was exported from a different checkpoint")
+
+        # First use or a new checkpoint: export it, then refuse to serve if the two paths disagree
+        self.device = torch.device('cpu')
+        self._load_torch(model_path)
+        print(f"Exporting AdaFace to ONNX at {self.onnx_path}...")
+        export_onnx(self.model, self.onnx_path)
+        self.session = create_onnx_session(self.onnx_path)
+        max_diff = validate_onnx(self.model, self.session)
+        if max_diff > ONNX_TOLERANCE:
+            os.remove(self.onnx_path)
+            raise RuntimeError(f"ONNX export does not match torch (max abs diff {max_diff:.2e})")
+        record_onnx_source(self.onnx_path, model_path)
+        print(f"AdaFace ONNX export validated (max abs diff {max_diff:.2e})")
+        # Only the session is needed from here on
+        self.model = None
+
+    def _preprocess(self, face_crops_bgr):
+        """
+        Resizes every crop to 112x112 and builds one normalised NCHW float32 array.
+        Equivalent to ToTensor + Normalize(0.5, 0.5) on the RGB image, done for the whole batch at once.
+        """
+        batch = np.stack([
+            cv2.resize(crop, (INPUT_SIZE, INPUT_SIZE), interpolation=cv2.INTER_CUBIC) for crop in face_crops_bgr
         ])
+        # BGR -> RGB and NHWC -> NCHW as views, then one float conversion and in-place scaling to [-1, 1]
+        batch = batch[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32, order="C")
+        batch /= 127.5
+        batch -= 1.0
+        return batch
+
+    def _forward(self, batch):
+        if self.session is not None:
+            return self.session.run(["embedding"], {"input": batch})[0]
+        with torch.inference_mode():
+            # The model returns (embedding, norm). We only need the embedding.
+            embeddings, _ = self.model(torch.from_numpy(batch).to(self.device))
+        return embeddings.cpu().numpy()
+
+    def get_embeddings(self, face_crops_bgr, batch_size=None):
+        """
+        Generates 512-dimensional embeddings for a list of cropped face images.
+        Returns a list aligned with the input; empty or missing crops yield None.
+        """
+        batch_size = batch_size or self.batch_size
+        embeddings = [None] * len(face_crops_bgr)
+        valid = [i for i, crop in enumerate(face_crops_bgr) if crop is not None and crop.size > 0]
+
+        for start in range(0, len(valid), batch_size):
+            chunk = valid[start:start + batch_size]
+            batch_embeddings = self._forward(self._preprocess([face_crops_bgr[i] for i in chunk]))
+            for i, embedding in zip(chunk, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
 
     def get_embedding(self, face_crop_bgr):
         """
         Generates a 512-dimensional embedding for a cropped face image.
         """
-        if face_crop_bgr is None or face_crop_bgr.size == 0:
-            return None
+        return self.get_embeddings([face_crop_bgr])[0]
 
-        # Preprocess the image
-        face_resized = cv2.resize(face_crop_bgr, (112, 112), interpolation=cv2.INTER_CUBIC)
-        face_rgb = cv2.cvtColor(face_resized, cv2.COLOR_BGR2RGB)
-        face_tensor = self.transform(face_rgb).unsqueeze(0).to(self.device)
 
-        # Get embedding with no gradient calculation
-        with torch.no_grad():
-            # The model returns (embedding, norm). We only need the embedding.
-            embedding, _ = self.model(face_tensor)
-            embedding_numpy = embedding.cpu().numpy().flatten()
-            
-        return embedding_numpy
\ No newline at end of file
+if __name__ == "__main__":
+    # Export step: python -m backend.adaface_model [checkpoint_path]
+    import sys
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    checkpoint = sys.argv[1] if len(sys.argv) > 1 else os.path.join(project_root, "models", "adaface_ir101_webface12m.ckpt")
+    AdaFaceModel(checkpoint, use_gpu=False, backend="onnxruntime")
@@ -0,0 +1,52 @@
+# backend/benchmarks/adaface_bench.py
+# AdaFace IR-101 throughput (crops/sec) on CPU at different batch sizes, torch vs. ONNX Runtime.
+# Run from the project root: python -m backend.benchmarks.adaface_bench
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+
+from backend.adaface_model import AdaFaceModel
+from backend.net import IR_101
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+ADAFACE_MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "adaface_ir101_webface12m.ckpt")
+BATCH_SIZES = [1, 8, 32, 64]
+CROPS = int(os.getenv("BENCH_CROPS", 128))
+
+
+def checkpoint_path():
+    """Uses the real checkpoint when present; throughput does not depend on the weights otherwise."""
+    if os.path.exists(ADAFACE_MODEL_PATH):
+        return ADAFACE_MODEL_PATH
+    random_path = os.path.join(tempfile.mkdtemp(), "adaface_random.ckpt")
+    torch.save(IR_101(input_size=(112, 112)).state_dict(), random_path)
+    return random_path
+
+
+def main():
+    model_path = checkpoint_path()
+    rng = np.random.default_rng(0)
+    # Face crops of varying size, as the detector hands them over
+    crops = [rng.integers(0, 255, (rng.integers(60, 220), rng.integers(60, 220), 3), dtype=np.uint8) for _ in range(CROPS)]
+
+    results = {}
+    for backend in ("torch", "onnxruntime"):
+        model = AdaFaceModel(model_path, use_gpu=False, backend=backend)
+        model.get_embeddings(crops[:8], batch_size=8)  # warm-up
+        results[backend] = np.stack(model.get_embeddings(crops[:16]))
+
+        print(f"\n{backend}: torch {torch.__version__}, {torch.get_num_threads()} intra-op thread(s), {CROPS} crops")
+        print(f"{'batch':>6} | {'crops/sec':>9} | {'ms/crop':>7}")
+        for batch_size in BATCH_SIZES:
+            start = time.perf_counter()
+            model.get_embeddings(crops, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"{batch_size:>6} | {CROPS / elapsed:>9.1f} | {elapsed / CROPS * 1000:>7.1f}")
+
+    print(f"\nMax abs embedding difference torch vs onnxruntime: {np.abs(results['torch'] - results['onnxruntime']).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
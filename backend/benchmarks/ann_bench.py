@@ -0,0 +1,71 @@
+# backend/benchmarks/ann_bench.py
+# Recall@1 vs. latency of the IVF gallery index against exact search.
+# Run from the project root: python -m backend.benchmarks.ann_bench
+import os
+import tempfile
+import time
+import numpy as np
+
+from backend.gallery import EmbeddingGallery, ExactIndex, IVFIndex, l2_normalize
+
+EMBEDDING_DIM = 512
+GALLERY_SIZES = [10_000, 50_000]
+N_PROBES = [1, 2, 4, 8, 16, 32]
+QUERIES = 200
+# Norm of the perturbation added to a gallery vector (cosine ~0.7 to its source, like a live AdaFace crop)
+QUERY_NOISE = 1.0
+
+
+def make_gallery(size, rng):
+    """Clustered synthetic embeddings, closer to real face galleries than isotropic noise."""
+    centres = rng.standard_normal((max(1, size // 50), EMBEDDING_DIM)).astype(np.float32)
+    members = centres[rng.integers(0, len(centres), size)]
+    return l2_normalize(members + rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32))
+
+
+def timed_search(index, queries):
+    """One query at a time, as the pipeline issues them for a single new track."""
+    found = np.empty(len(queries), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        found[i] = index.search(query[None, :], 1)[0][0, 0]
+    return (time.perf_counter() - start) / len(queries) * 1000, found
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for size in GALLERY_SIZES:
+        matrix = make_gallery(size, rng)
+        sources = rng.integers(0, size, QUERIES)
+        noise = QUERY_NOISE * l2_normalize(rng.standard_normal((QUERIES, EMBEDDING_DIM)))
+        queries = l2_normalize(matrix[sources] + noise)
+
+        exact_ms, truth = timed_search(ExactIndex(matrix), queries)
+        print(f"\n{size} identities, exact search: {exact_ms:.3f} ms/query")
+
+        start = time.perf_counter()
+        ivf = IVFIndex.build(matrix)
+        print(f"IVF build ({len(ivf.centroids)} lists): {time.perf_counter() - start:.2f} s")
+
+        print(f"{'n_probe':>8} | {'ms/query':>9} | {'speedup':>8} | recall@1")
+        for n_probe in N_PROBES:
+            ivf.n_probe = n_probe
+            ivf_ms, found = timed_search(ivf, queries)
+            recall = np.mean(found == truth)
+            print(f"{n_probe:>8} | {ivf_ms:>9.3f} | {exact_ms / ivf_ms:>7.1f}x | {recall:.3f}")
+
+        # Startup cost with and without the persisted index
+        student_db = {str(i): {"adaface_embedding": matrix[i]} for i in range(size)}
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = os.path.join(tmp, "gallery.ivf.npz")
+            start = time.perf_counter()
+            EmbeddingGallery(student_db, index="ivf", index_path=index_path)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            EmbeddingGallery(student_db, index="ivf", index_path=index_path)
+            warm = time.perf_counter() - start
+        print(f"Gallery startup: {cold:.2f} s cold (build + save), {warm:.2f} s warm (load)")
+
+
+if __name__ == "__main__":
+    main()
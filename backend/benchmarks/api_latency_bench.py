@@ -0,0 +1,108 @@
+# backend/benchmarks/api_latency_bench.py
+# API response latency (p50/p99) while 1, 2 and 4 verification pipelines run, thread vs. process execution.
+# Starts its own uvicorn server per configuration, so the port must be free.
+# Run from the project root: python -m backend.benchmarks.api_latency_bench [video_path]
+#
+# Results (1 CPU core, 5 GB RAM; YOLOv8n face detector, IR-101 recognition, 20 s 1280x720 clip,
+# 4 clients, 20 s per configuration):
+#     mode | pipelines | requests | p50 ms | p99 ms | max ms
+#   thread |         1 |     5616 |   13.7 |   26.3 |   32.3
+#   thread |         2 |     3916 |   19.4 |   38.8 |   64.3
+#   thread |         4 |     2150 |   35.3 |   73.6 |  101.1
+#  process |         1 |     5439 |   14.0 |   28.9 |   52.6
+#  process |         2 |     3704 |   20.5 |   41.9 |   55.9
+#  process |         4 |     1814 |   39.7 |  149.8 |  431.8
+# On a single core the workers compete with the API for the same CPU, so process mode cannot win;
+# its payoff (no GIL contention with the event loop) needs a core per worker. Each worker also loads
+# its own models, so four workers took this host to ~4.4 GB used.
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import requests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SAMPLE_VIDEO = os.path.join(PROJECT_ROOT, "data", "videos", "sample4.mov")
+PORT = int(os.getenv("BENCH_PORT", 8765))
+BASE_URL = f"http://127.0.0.1:{PORT}"
+PIPELINE_COUNTS = [1, 2, 4]
+MODES = ["thread", "process"]
+DURATION = float(os.getenv("BENCH_SECONDS", 20))
+CLIENTS = int(os.getenv("BENCH_CLIENTS", 4))
+ENDPOINTS = ["/", "/api/attendance/pipelines"]
+
+
+def start_server(mode):
+    env = {**os.environ, "PIPELINE_EXECUTION": mode, "MAX_CONCURRENT_PIPELINES": str(max(PIPELINE_COUNTS))}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env,
+    )
+    for _ in range(600):
+        try:
+            requests.get(BASE_URL + "/", timeout=1)
+            return server
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("API server did not come up")
+
+
+def start_pipelines(count, video_path):
+    ids = [f"bench-hall-{i}" for i in range(count)]
+    for pipeline_id in ids:
+        response = requests.post(f"{BASE_URL}/api/attendance/pipelines/{pipeline_id}/start",
+                                 json={"video_source": video_path}, timeout=600)
+        response.raise_for_status()
+    return ids
+
+
+def measure(seconds):
+    """Latencies in ms from CLIENTS threads calling the light endpoints back to back."""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(offset):
+        session = requests.Session()
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            session.get(BASE_URL + ENDPOINTS[i % len(ENDPOINTS)], timeout=30)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies)
+
+
+def main():
+    video_path = sys.argv[1] if len(sys.argv) > 1 else SAMPLE_VIDEO
+    print(f"Source: {video_path}, {CLIENTS} client threads, {DURATION:.0f}s per configuration")
+    print(f"{'mode':>8} | {'pipelines':>9} | {'requests':>8} | {'p50 ms':>7} | {'p99 ms':>7} | {'max ms':>7}")
+    for mode in MODES:
+        server = start_server(mode)
+        try:
+            for count in PIPELINE_COUNTS:
+                ids = start_pipelines(count, video_path)
+                time.sleep(2)  # Let the pipelines reach steady state
+                latencies = measure(DURATION)
+                for pipeline_id in ids:
+                    requests.post(f"{BASE_URL}/api/attendance/pipelines/{pipeline_id}/stop", timeout=60)
+                print(f"{mode:>8} | {count:>9} | {len(latencies):>8} | {np.percentile(latencies, 50):>7.1f} | "
+                      f"{np.percentile(latencies, 99):>7.1f} | {latencies.max():>7.1f}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# backend/benchmarks/decode_bench.py
+# Decode CPU of ThreadedCapture on a file source when skipped frames are only grab()bed.
+# Run from the project root: python -m backend.benchmarks.decode_bench [video_path]
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+from backend.video_capture import ThreadedCapture
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SAMPLE_VIDEO = os.path.join(PROJECT_ROOT, "data", "videos", "sample4.mov")
+SKIPS = [1, 2, 5, 10]
+FRAMES = int(os.getenv("BENCH_FRAMES", 600))
+
+
+def synthetic_video():
+    """A 1080p MPEG-4 clip with panning content, for checkouts without the sample video."""
+    path = os.path.join(tempfile.mkdtemp(), "decode_bench.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (1920, 1080))
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 255, (1080 // 8, 1920 // 8, 3), dtype=np.uint8)
+    background = cv2.resize(noise, (1920, 1080), interpolation=cv2.INTER_CUBIC)
+    for i in range(FRAMES):
+        writer.write(np.roll(background, i * 8, axis=1))
+    writer.release()
+    return path
+
+
+def video_path():
+    if len(sys.argv) > 1:
+        return sys.argv[1]
+    probe = cv2.VideoCapture(SAMPLE_VIDEO)
+    opened = probe.isOpened()
+    probe.release()
+    return SAMPLE_VIDEO if opened else synthetic_video()
+
+
+def main():
+    path = video_path()
+    print(f"Source: {path}")
+    print(f"{'skip':>5} | {'grabbed':>7} | {'decoded':>7} | {'cpu s':>6} | {'wall s':>6} | {'cpu vs skip=1':>13}")
+    baseline = None
+    for skip in SKIPS:
+        capture = ThreadedCapture(path, drop_frames=False, should_decode=lambda i, skip=skip: i % skip == 0)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        while capture.read()[0]:
+            pass
+        cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+        capture.release()
+        baseline = baseline or cpu
+        print(f"{skip:>5} | {capture.grabbed_frames - 1:>7} | {capture.captured_frames:>7} | {cpu:>6.2f} | {wall:>6.2f} | {cpu / baseline:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
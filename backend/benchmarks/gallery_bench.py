@@ -0,0 +1,58 @@
+# backend/benchmarks/gallery_bench.py
+# Micro-benchmark: per-student scipy cosine loop vs. the vectorized EmbeddingGallery.
+# Run from the project root: python -m backend.benchmarks.gallery_bench
+import time
+import numpy as np
+from scipy.spatial.distance import cosine
+
+from backend.gallery import EmbeddingGallery
+
+EMBEDDING_DIM = 512
+GALLERY_SIZES = [100, 1_000, 10_000]
+QUERIES = 50
+
+
+def loop_match(student_db, embedding):
+    """The original VerificationPipeline._match_embedding_to_db loop."""
+    min_dist, matched_roll_no = float('inf'), "Unknown"
+    second_min_dist = float('inf')
+    for roll_no, data in student_db.items():
+        dist = cosine(embedding, data["adaface_embedding"])
+        if dist < min_dist:
+            second_min_dist = min_dist
+            min_dist, matched_roll_no = dist, roll_no
+        elif dist < second_min_dist:
+            second_min_dist = dist
+    return matched_roll_no, min_dist, second_min_dist
+
+
+def make_student_db(size, rng):
+    vectors = rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32)
+    return {f"{i:05d}": {"name": f"Student {i}", "adaface_embedding": vectors[i]} for i in range(size)}
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries) * 1000, results
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'identities':>10} | {'loop ms':>9} | {'gallery ms':>10} | {'build ms':>8} | {'speedup':>8} | agree")
+    for size in GALLERY_SIZES:
+        student_db = make_student_db(size, rng)
+        queries = rng.standard_normal((QUERIES, EMBEDDING_DIM)).astype(np.float32)
+
+        start = time.perf_counter()
+        gallery = EmbeddingGallery(student_db)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        loop_ms, loop_results = time_per_query(lambda q: loop_match(student_db, q), queries)
+        gallery_ms, gallery_results = time_per_query(gallery.match, queries)
+        agree = all(a[0] == b[0] for a, b in zip(loop_results, gallery_results))
+        print(f"{size:>10} | {loop_ms:>9.3f} | {gallery_ms:>10.3f} | {build_ms:>8.1f} | {loop_ms / gallery_ms:>7.1f}x | {agree}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# backend/benchmarks/quantized_bench.py
+# Memory footprint, latency and match-decision changes of the float16 / int8 gallery modes.
+# The quantized indexes re-rank from a memmap, as a store-backed pipeline does; "private MB" is
+# memory only that pipeline holds, "scanned MB" what one query reads (page cache included).
+# Run from the project root: python -m backend.benchmarks.quantized_bench
+import os
+import tempfile
+import time
+import numpy as np
+
+from backend.gallery import EmbeddingGallery, ExactIndex, QuantizedIndex, l2_normalize, resident_nbytes
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+PHOTOS_FOLDER = os.path.join(PROJECT_ROOT, "data", "registration_photos")
+ADAFACE_MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "adaface_ir101_webface12m.ckpt")
+RECOGNITION_THRESHOLD = float(os.getenv("RECOGNITION_THRESHOLD", 0.4))
+
+EMBEDDING_DIM = 512
+GALLERY_SIZES = [10_000, 50_000]
+QUERIES = 200
+BATCH = 8  # New tracks matched together in one frame
+RERANK = 32
+
+
+def per_query_ms(index, queries, batch=1):
+    found = np.empty(len(queries), dtype=np.int64)
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        found[i:i + batch] = index.search(queries[i:i + batch], 1)[0][:, 0]
+    return (time.perf_counter() - start) / len(queries) * 1000, found
+
+
+def on_disk(matrix, folder):
+    """The matrix as a read-only memmap, the way pipelines open the embedding store."""
+    path = os.path.join(folder, f"gallery_{len(matrix)}.bin")
+    matrix.tofile(path)
+    return np.memmap(path, dtype=matrix.dtype, mode="r", shape=matrix.shape)
+
+
+def synthetic_benchmark(rng, folder):
+    for size in GALLERY_SIZES:
+        centres = rng.standard_normal((size // 50, EMBEDDING_DIM)).astype(np.float32)
+        matrix = l2_normalize(centres[rng.integers(0, len(centres), size)]
+                              + rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32))
+        noise = l2_normalize(rng.standard_normal((QUERIES, EMBEDDING_DIM)))
+        queries = l2_normalize(matrix[rng.integers(0, size, QUERIES)] + noise)
+        store = on_disk(matrix, folder)
+
+        _, truth = per_query_ms(ExactIndex(matrix), queries)
+        print(f"\n{size} identities")
+        print(f"{'mode':>15} | {'private MB':>10} | {'scanned MB':>10} | {'ms/query':>8} | "
+              f"{f'ms/q x{BATCH}':>8} | top-1 agreement")
+        rows = [("float32 RAM", ExactIndex(matrix), matrix.nbytes),
+                ("float32 memmap", ExactIndex(store), matrix.nbytes)]
+        for precision in ("float16", "int8"):
+            index = QuantizedIndex(store, precision=precision, rerank=RERANK)
+            scanned = index.codes.nbytes + RERANK * EMBEDDING_DIM * matrix.itemsize
+            rows.append((f"{precision} memmap", index, scanned))
+        for name, index, scanned in rows:
+            private = index.resident_nbytes if isinstance(index, QuantizedIndex) else resident_nbytes(index.matrix)
+            ms, found = per_query_ms(index, queries)
+            batch_ms, _ = per_query_ms(index, queries, BATCH)
+            print(f"{name:>15} | {private / 2**20:>10.1f} | {scanned / 2**20:>10.1f} | {ms:>8.3f} | "
+                  f"{batch_ms:>8.3f} | {np.mean(found == truth):.3f}")
+
+
+def photo_benchmark():
+    """Enrol photos 1-2 of each student and query with the rest, as registration and the pipeline would."""
+    if not os.path.exists(ADAFACE_MODEL_PATH):
+        print(f"\nSkipping enrolled-photo comparison: AdaFace checkpoint not found at {ADAFACE_MODEL_PATH}")
+        return
+    import cv2
+    from backend.adaface_model import AdaFaceModel
+
+    adaface = AdaFaceModel(ADAFACE_MODEL_PATH)
+    student_db, queries, query_truth = {}, [], []
+    for folder in sorted(os.listdir(PHOTOS_FOLDER)):
+        roll_no = folder.split('_')[0]
+        photos = sorted(os.listdir(os.path.join(PHOTOS_FOLDER, folder)))
+        embeddings = [adaface.get_embedding(cv2.imread(os.path.join(PHOTOS_FOLDER, folder, p))) for p in photos]
+        embeddings = [e for e in embeddings if e is not None]
+        if len(embeddings) < 2:
+            continue
+        student_db[roll_no] = {"adaface_embedding": np.mean(embeddings[:2], axis=0)}
+        queries.extend(embeddings[2:])
+        query_truth.extend([roll_no] * len(embeddings[2:]))
+
+    decisions = {}
+    for mode in ("exact", "float16", "int8"):
+        gallery = EmbeddingGallery(student_db, index=mode, rerank=RERANK)
+        roll_nos, distances = gallery.search(np.array(queries), k=1)
+        decisions[mode] = [r if d < RECOGNITION_THRESHOLD else "Unknown" for r, d in zip(roll_nos[:, 0], distances[:, 0])]
+
+    print(f"\nEnrolled photos: {len(student_db)} students, {len(queries)} query photos")
+    for mode, decided in decisions.items():
+        correct = sum(d == t for d, t in zip(decided, query_truth))
+        changed = sum(d != e for d, e in zip(decided, decisions["exact"]))
+        print(f"{mode:>8}: {correct}/{len(queries)} correct, {changed} decision(s) differ from exact")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        synthetic_benchmark(np.random.default_rng(0), folder)
+    photo_benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# backend/benchmarks/stream_load_bench.py
+# Many concurrent /stream viewers on one pipeline: frames each viewer receives, API latency
+# alongside them, and the server's thread count (viewers should cost coroutines, not threads).
+# Starts its own uvicorn server, so the port must be free.
+# Run from the project root: python -m backend.benchmarks.stream_load_bench [video_path]
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import aiohttp
+import numpy as np
+import psutil
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SAMPLE_VIDEO = os.path.join(PROJECT_ROOT, "data", "videos", "sample4.mov")
+PORT = int(os.getenv("BENCH_PORT", 8766))
+BASE_URL = f"http://127.0.0.1:{PORT}"
+VIEWER_COUNTS = [1, 10, 100, 300]
+DURATION = float(os.getenv("BENCH_SECONDS", 15))
+PIPELINE_ID = "stream-bench"
+BOUNDARY = b"--frame\r\n"
+
+
+async def wait_for_server(session):
+    for _ in range(600):
+        try:
+            async with session.get(BASE_URL + "/"):
+                return
+        except aiohttp.ClientConnectionError:
+            await asyncio.sleep(0.5)
+    raise RuntimeError("API server did not come up")
+
+
+async def viewer(session, deadline, frames, index):
+    """Reads the MJPEG stream until the deadline, counting parts (a boundary may straddle two reads)."""
+    tail = b""
+    async with session.get(f"{BASE_URL}/api/attendance/pipelines/{PIPELINE_ID}/stream") as response:
+        while time.perf_counter() < deadline:
+            try:
+                chunk = await asyncio.wait_for(response.content.readany(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                break
+            data = tail + chunk
+            frames[index] += data.count(BOUNDARY)
+            tail = data[-(len(BOUNDARY) - 1):]
+
+
+async def poll_api(session, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with session.get(f"{BASE_URL}/api/attendance/pipelines/{PIPELINE_ID}/status") as response:
+            await response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def run_round(count, server_process):
+    frames = [0] * count
+    latencies = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None)) as session:
+        deadline = time.perf_counter() + DURATION
+        tasks = [asyncio.create_task(viewer(session, deadline, frames, i)) for i in range(count)]
+        tasks.append(asyncio.create_task(poll_api(session, deadline, latencies)))
+        await asyncio.sleep(DURATION / 2)
+        threads = server_process.num_threads()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    fps = np.array(frames) / DURATION
+    latencies = np.array(latencies or [0.0])
+    print(f"{count:>7} | {np.median(fps):>8.1f} | {fps.min():>7.1f} | {np.percentile(latencies, 50):>7.1f} | "
+          f"{np.percentile(latencies, 99):>7.1f} | {threads:>7}")
+
+
+async def main():
+    video_path = sys.argv[1] if len(sys.argv) > 1 else SAMPLE_VIDEO
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+    )
+    try:
+        async with aiohttp.ClientSession() as session:
+            await wait_for_server(session)
+            async with session.post(f"{BASE_URL}/api/attendance/pipelines/{PIPELINE_ID}/start",
+                                    json={"video_source": video_path}) as response:
+                response.raise_for_status()
+        print(f"Source: {video_path}, {DURATION:.0f}s per round")
+        print(f"{'viewers':>7} | {'med fps':>8} | {'min fps':>7} | {'p50 ms':>7} | {'p99 ms':>7} | {'threads':>7}")
+        for count in VIEWER_COUNTS:
+            await run_round(count, psutil.Process(server.pid))
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{BASE_URL}/api/attendance/pipelines/{PIPELINE_ID}/stop") as response:
+                print(f"Stopped: {await response.json()}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
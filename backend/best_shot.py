@@ -0,0 +1,53 @@
+# backend/best_shot.py (Per-track best-shot crop selection)
+import heapq
+import itertools
+import math
+import cv2
+
+# Crops are scored at this size so sharpness does not simply reward larger faces twice
+SHARPNESS_SIZE = 112
+
+
+def get_image_sharpness(image):
+    if image is None or image.size == 0: return 0
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+def score_crop(crop, confidence):
+    """Higher is better: log Laplacian variance at a fixed size x face side length x detector confidence."""
+    if crop is None or crop.size == 0:
+        return 0.0
+    sharpness = get_image_sharpness(cv2.resize(crop, (SHARPNESS_SIZE, SHARPNESS_SIZE), interpolation=cv2.INTER_AREA))
+    side = math.sqrt(crop.shape[0] * crop.shape[1])
+    return math.log1p(sharpness) * side * max(float(confidence), 1e-3)
+
+
+class BestShotBuffer:
+    """Keeps the `k` highest-scoring crops of one track in a min-heap; everything else is discarded on arrival."""
+
+    __slots__ = ("k", "heap", "seen")
+    _counter = itertools.count()  # Tie-breaker so the heap never compares two crops
+
+    def __init__(self, k=3):
+        self.k = k
+        self.heap = []
+        self.seen = 0
+
+    def offer(self, crop, confidence):
+        self.seen += 1
+        score = score_crop(crop, confidence)
+        if score <= 0:
+            return
+        if len(self.heap) < self.k:
+            # Copy so the buffer does not keep the whole decoded frame alive
+            heapq.heappush(self.heap, (score, next(self._counter), crop.copy()))
+        elif score > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (score, next(self._counter), crop.copy()))
+
+    def best(self):
+        """Crops from best to worst."""
+        return [crop for _, _, crop in sorted(self.heap, reverse=True)]
+
+    def __len__(self):
+        return len(self.heap)
@@ -8,10 +8,18 @@ import numpy as np
 
 # Import auth module ONLY to use its hashing function from the parent directory
 from . import auth 
+from .embedding_store import EmbeddingStore
 
 DB_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
 DB_FILE = os.path.join(DB_FOLDER, "project_netra_final.db")
+# Persisted ANN index for the face gallery, rebuilt automatically when the roster changes
+GALLERY_INDEX_FILE = os.path.join(DB_FOLDER, "project_netra_final.ivf.npz")
+# Change-log entries kept for pipelines that are behind; older ones are pruned on write
+STUDENT_CHANGE_RETENTION = 1000
+# Registration writes AdaFace embeddings to students.adaface_embedding; pipelines must query with the same model
+EMBEDDING_MODEL = "AdaFace"
 os.makedirs(DB_FOLDER, exist_ok=True)
+_embedding_store = None
 #hhdfd
 def _get_department_id_by_code(cursor, dept_code):
     if not dept_code:
@@ -74,6 +82,12 @@ def initialize_database():
             adaface_embedding BLOB,  -- NEW COLUMN
             FOREIGN KEY(department_id) REFERENCES departments(id) ON DELETE SET NULL
         )''')
+    # Change log for the students table. Running pipelines poll MAX(version) and
+    # apply only the changed roll numbers; a NULL roll_no means the table was recreated.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS student_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT, roll_no TEXT, changed_at TEXT NOT NULL
+        )''')
     # Timetable table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS timetable (id INTEGER PRIMARY KEY, schedule TEXT NOT NULL)''')
@@ -142,34 +156,154 @@ def recreate_students_table():
     conn.commit()
     conn.close()
     initialize_database()
+    conn = sqlite3.connect(DB_FILE)
+    _record_student_change(conn.cursor(), None)
+    conn.commit()
+    conn.close()
+    _sync_embedding_store(get_embedding_store().clear)
+
+# --- STUDENT CHANGE LOG (live gallery reload) ---
+
+def _record_student_change(cursor, roll_no):
+    cursor.execute("INSERT INTO student_changes (roll_no, changed_at) VALUES (?, ?)",
+                   (roll_no, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    version = cursor.lastrowid
+    # A recreate forces every pipeline into a full diff, so nothing before it is needed any more.
+    # Otherwise keep a window; a pipeline that falls behind it gets a full diff too (see below).
+    keep_from = version if roll_no is None else version - STUDENT_CHANGE_RETENTION + 1
+    cursor.execute("DELETE FROM student_changes WHERE version < ?", (keep_from,))
+
+def get_student_change_version():
+    """Latest change counter; cheap enough for a running pipeline to poll."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM student_changes")
+        version = cursor.fetchone()[0]
+        conn.close()
+        return version
+    except sqlite3.OperationalError:
+        return 0
+
+def get_student_changes(since_version: int):
+    """
+    Returns (latest_version, changed_roll_nos) for changes after since_version.
+    changed_roll_nos is None when the students table was recreated in the meantime,
+    or when entries the caller has not seen yet were already pruned.
+    """
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        cursor.execute("SELECT version, roll_no FROM student_changes WHERE version > ?", (since_version,))
+        rows = cursor.fetchall()
+        cursor.execute("SELECT MIN(version) FROM student_changes")
+        oldest_version = cursor.fetchone()[0]
+        conn.close()
+    except sqlite3.OperationalError:
+        return since_version, set()
+    if not rows:
+        return since_version, set()
+    latest_version = max(r[0] for r in rows)
+    if oldest_version > since_version + 1 or any(r[1] is None for r in rows):
+        return latest_version, None
+    return latest_version, {r[1] for r in rows}
+
+# --- MEMORY-MAPPED EMBEDDING STORE ---
+
+def get_embedding_store():
+    """Created lazily so EMBEDDING_STORE_DTYPE is read after main.py has loaded the .env file."""
+    global _embedding_store
+    if _embedding_store is None:
+        _embedding_store = EmbeddingStore(DB_FOLDER, dtype=os.getenv("EMBEDDING_STORE_DTYPE", "float32"),
+                                          model=EMBEDDING_MODEL)
+    return _embedding_store
+
+def rebuild_embedding_store():
+    """Regenerates the embedding store from the students table."""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT s.roll_no, s.name, s.student_class, d.code, s.adaface_embedding
+        FROM students s LEFT JOIN departments d ON s.department_id = d.id
+        WHERE s.adaface_embedding IS NOT NULL
+    """)
+    rows = [(r[0], r[1], r[2], r[3], np.frombuffer(r[4], dtype=np.float32)) for r in cursor.fetchall()]
+    conn.close()
+    get_embedding_store().rebuild(rows)
+
+def _sync_embedding_store(operation, *args, **kwargs):
+    """Applies a change to the embedding store; falls back to a full rebuild if it cannot be applied."""
+    try:
+        operation(*args, **kwargs)
+    except Exception as e:
+        print(f"Embedding store out of sync ({e}); rebuilding from the database.")
+        rebuild_embedding_store()
+
+def load_embedding_store():
+    """
+    Opens the memory-mapped embeddings for a pipeline, rebuilding them first if the
+    store is missing or its row count no longer matches the students table.
+    """
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM students WHERE adaface_embedding IS NOT NULL")
+        expected_count = cursor.fetchone()[0]
+        conn.close()
+    except sqlite3.OperationalError:
+        expected_count = 0
+    if not get_embedding_store().is_valid(expected_count):
+        rebuild_embedding_store()
+    return get_embedding_store().load()
 
 def add_student(roll_no, name, student_class, embedding, parent_phone_number=None, department=None):
     """Adds a student. Translates department code to ID before inserting."""
+    add_students([(roll_no, name, student_class, embedding, parent_phone_number, department)])
+
+def add_students(students):
+    """
+    Adds many (roll_no, name, student_class, embedding, parent_phone_number, department) rows
+    in one transaction and one embedding store write, so bulk registration stays linear.
+    """
+    if not students:
+        return
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
-    # --- CHANGE: Look up department ID from the code ---
-    department_id = _get_department_id_by_code(cursor, department)
-    serialized_embedding = sqlite3.Binary(embedding.tobytes())
-    
-    # --- CRITICAL FIX: Insert into the new 'adaface_embedding' column ---
-    cursor.execute(
-        "REPLACE INTO students (roll_no, name, student_class, parent_phone_number, department_id, adaface_embedding) VALUES (?, ?, ?, ?, ?, ?)",
-        (roll_no, name, student_class, parent_phone_number, department_id, serialized_embedding)
-    )
+    department_ids = {}
+    for roll_no, name, student_class, embedding, parent_phone_number, department in students:
+        # --- CHANGE: Look up department ID from the code ---
+        if department not in department_ids:
+            department_ids[department] = _get_department_id_by_code(cursor, department)
+        serialized_embedding = sqlite3.Binary(embedding.tobytes())
+        
+        # --- CRITICAL FIX: Insert into the new 'adaface_embedding' column ---
+        cursor.execute(
+            "REPLACE INTO students (roll_no, name, student_class, parent_phone_number, department_id, adaface_embedding) VALUES (?, ?, ?, ?, ?, ?)",
+            (roll_no, name, student_class, parent_phone_number, department_ids[department], serialized_embedding)
+        )
+        _record_student_change(cursor, roll_no)
     conn.commit()
     conn.close()
+    _sync_embedding_store(get_embedding_store().upsert_many,
+                          [(roll_no, embedding, name, student_class, department)
+                           for roll_no, name, student_class, embedding, _, department in students])
 
-def get_all_student_data():
+def _fetch_student_data(where_clause="", params=()):
     try:
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-        cursor.execute("SELECT roll_no, name, adaface_embedding FROM students")
+        # Class and department travel with the embedding so the pipeline can shard its gallery
+        cursor.execute(f"""
+            SELECT s.roll_no, s.name, s.adaface_embedding, s.student_class, d.code
+            FROM students s LEFT JOIN departments d ON s.department_id = d.id
+            {where_clause}
+        """, params)
         rows = cursor.fetchall()
         conn.close()
         
         student_data = {}
         for row in rows:
-            roll_no, name, embedding_blob = row
+            roll_no, name, embedding_blob, student_class, department = row
             embedding = None
             if embedding_blob:
                 # --- CRITICAL FIX: Deserialize using np.frombuffer ---
@@ -177,12 +311,24 @@ def get_all_student_data():
                 embedding = np.frombuffer(embedding_blob, dtype=np.float32)
             
             # --- CRITICAL FIX: Use the correct dictionary key ---
-            student_data[roll_no] = {"name": name, "adaface_embedding": embedding}
+            student_data[roll_no] = {"name": name, "adaface_embedding": embedding,
+                                     "student_class": student_class, "department": department}
             
         return student_data
     except sqlite3.OperationalError:
         return {}
 
+def get_all_student_data():
+    return _fetch_student_data()
+
+def get_student_data(roll_nos):
+    """Same shape as get_all_student_data, restricted to the given roll numbers."""
+    roll_nos = list(roll_nos)
+    if not roll_nos:
+        return {}
+    placeholders = ','.join('?' for _ in roll_nos)
+    return _fetch_student_data(f"WHERE s.roll_no IN ({placeholders})", tuple(roll_nos))
+
 def get_all_students_for_management():
     """Fetches all students, JOINS department to get the code."""
     try:
@@ -206,9 +352,14 @@ def delete_student(roll_no: str):
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
     cursor.execute("DELETE FROM students WHERE roll_no = ?", (roll_no,))
+    deleted = cursor.rowcount > 0
+    if deleted:
+        _record_student_change(cursor, roll_no)
     conn.commit()
     conn.close()
-    return cursor.rowcount > 0
+    if deleted:
+        _sync_embedding_store(get_embedding_store().delete, roll_no)
+    return deleted
 
 # --- ATTENDANCE & TIMETABLE ---
 
@@ -509,9 +660,14 @@ def update_student(roll_no: str, name: str, student_class: str, parent_phone_num
             "UPDATE students SET name = ?, student_class = ?, parent_phone_number = ? WHERE roll_no = ?",
             (name, student_class, parent_phone_number, roll_no)
         )
+        updated = cursor.rowcount > 0
+        if updated:
+            _record_student_change(cursor, roll_no)
         conn.commit()
         conn.close()
-        return cursor.rowcount > 0
+        if updated:
+            _sync_embedding_store(get_embedding_store().update_metadata, roll_no, name=name, student_class=student_class)
+        return updated
     except Exception as e:
         print(f"Database error updating student: {e}")
         conn.close()
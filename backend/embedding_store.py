@@ -0,0 +1,206 @@
+# backend/embedding_store.py (Memory-mapped face embedding store)
+import json
+import os
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within one process
+    fcntl = None
+
+# A read-only view of the store. `matrix` is an np.memmap whose rows line up with `roll_nos`,
+# `students` maps roll_no -> {"name", "student_class", "department"} and `model` names the
+# recognizer that produced the embeddings.
+EmbeddingSnapshot = namedtuple("EmbeddingSnapshot", ["roll_nos", "matrix", "students", "model"])
+
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+class EmbeddingStore:
+    """
+    Keeps every student's L2-normalised embedding in one contiguous array file
+    (`embeddings.bin`) plus a JSON index of roll numbers and roster metadata
+    (`embeddings.json`). Pipelines open the array with np.memmap, so concurrent
+    pipelines share a single page-cached copy and startup does no per-row
+    BLOB deserialisation.
+
+    Writers only ever append rows, overwrite a row in place, or atomically
+    replace both files, so readers holding an older mapping stay valid. Writes
+    hold an flock on `embeddings.lock`, so API workers and pipeline processes
+    never interleave their read-modify-write of the index.
+
+    The index records which recognizer `model` produced the embeddings; a store
+    written for another model is treated as missing and gets rebuilt.
+    """
+
+    def __init__(self, folder, dtype="float32", model="AdaFace"):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported embedding store dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+        self.dtype = dtype
+        self.model = model
+        self.data_file = os.path.join(folder, "embeddings.bin")
+        self.index_file = os.path.join(folder, "embeddings.json")
+        self.lock_file = os.path.join(folder, "embeddings.lock")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialises writers across threads (the thread lock) and processes (the file lock)."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- Index helpers ---
+
+    def _read_index(self):
+        if not os.path.exists(self.index_file) or not os.path.exists(self.data_file):
+            return None
+        try:
+            with open(self.index_file) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("dtype") != self.dtype or index.get("model") != self.model:
+            return None
+        # The array file may hold an extra row from an interrupted append, never fewer
+        expected_bytes = len(index["roll_nos"]) * index["dim"] * np.dtype(self.dtype).itemsize
+        if os.path.getsize(self.data_file) < expected_bytes:
+            return None
+        return index
+
+    def _write_index(self, index):
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_file, self.index_file)
+
+    def _encode(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        return vector.astype(self.dtype)
+
+    # --- Reads ---
+
+    def is_valid(self, expected_count=None):
+        index = self._read_index()
+        return index is not None and (expected_count is None or len(index["roll_nos"]) == expected_count)
+
+    def load(self):
+        """Opens the store read-only. Returns None when it is missing or unreadable."""
+        index = self._read_index()
+        if index is None:
+            return None
+        roll_nos = index["roll_nos"]
+        if roll_nos:
+            matrix = np.memmap(self.data_file, dtype=self.dtype, mode="r", shape=(len(roll_nos), index["dim"]))
+        else:
+            matrix = np.empty((0, index["dim"]), dtype=self.dtype)
+        students = {roll_no: dict(meta) for roll_no, meta in zip(roll_nos, index["students"])}
+        return EmbeddingSnapshot(roll_nos, matrix, students, index["model"])
+
+    # --- Writes ---
+
+    def rebuild(self, rows):
+        """Rewrites the whole store from (roll_no, name, student_class, department, embedding) rows."""
+        roll_nos, students, vectors = [], [], []
+        for roll_no, name, student_class, department, embedding in rows:
+            if embedding is None:
+                continue
+            roll_nos.append(roll_no)
+            students.append({"name": name, "student_class": student_class, "department": department})
+            vectors.append(self._encode(embedding))
+        dim = len(vectors[0]) if vectors else 0
+        matrix = np.stack(vectors) if vectors else np.empty((0, 0), dtype=self.dtype)
+
+        with self._write_lock():
+            tmp_file = f"{self.data_file}.tmp"
+            matrix.tofile(tmp_file)
+            os.replace(tmp_file, self.data_file)
+            self._write_index({"dtype": self.dtype, "model": self.model, "dim": dim,
+                               "roll_nos": roll_nos, "students": students})
+
+    def upsert(self, roll_no, embedding, name, student_class, department):
+        """Overwrites the student's row in place, or appends it when the roll number is new."""
+        self.upsert_many([(roll_no, embedding, name, student_class, department)])
+
+    def upsert_many(self, rows):
+        """
+        upsert() for many (roll_no, embedding, name, student_class, department) rows: known
+        roll numbers are overwritten in place, new ones appended as one block, and the index
+        is read and written once for the whole batch.
+        """
+        # A roll number given twice keeps its last row
+        rows = list({roll_no: (roll_no, self._encode(embedding), name, student_class, department)
+                     for roll_no, embedding, name, student_class, department in rows}.values())
+        if not rows:
+            return
+        dim = len(rows[0][1])
+        with self._write_lock():
+            index = self._read_index()
+            if index is None or (index["roll_nos"] and index["dim"] != dim) or any(len(r[1]) != dim for r in rows):
+                raise RuntimeError("Embedding store is missing or incompatible; it must be rebuilt")
+            index["dim"] = dim
+            positions = {roll_no: row for row, roll_no in enumerate(index["roll_nos"])}
+            row_bytes = dim * np.dtype(self.dtype).itemsize
+            appended = []
+
+            with open(self.data_file, "r+b") as f:
+                for roll_no, vector, name, student_class, department in rows:
+                    meta = {"name": name, "student_class": student_class, "department": department}
+                    if roll_no in positions:
+                        row = positions[roll_no]
+                        f.seek(row * row_bytes)
+                        f.write(vector.tobytes())
+                        index["students"][row] = meta
+                    else:
+                        positions[roll_no] = len(index["roll_nos"])
+                        index["roll_nos"].append(roll_no)
+                        index["students"].append(meta)
+                        appended.append(vector)
+                if appended:
+                    # Truncate any partial row left behind by an interrupted append first
+                    first_new = len(index["roll_nos"]) - len(appended)
+                    f.truncate(first_new * row_bytes)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.stack(appended).tobytes())
+            self._write_index(index)
+
+    def update_metadata(self, roll_no, **fields):
+        with self._write_lock():
+            index = self._read_index()
+            if index is None or roll_no not in index["roll_nos"]:
+                return
+            index["students"][index["roll_nos"].index(roll_no)].update(fields)
+            self._write_index(index)
+
+    def delete(self, roll_no):
+        """Removes a student by atomically replacing the store with a compacted copy."""
+        with self._write_lock():
+            index = self._read_index()
+            if index is None or roll_no not in index["roll_nos"]:
+                return
+            row = index["roll_nos"].index(roll_no)
+            shape = (len(index["roll_nos"]), index["dim"])
+            matrix = np.fromfile(self.data_file, dtype=self.dtype, count=shape[0] * shape[1]).reshape(shape)
+
+            tmp_file = f"{self.data_file}.tmp"
+            np.delete(matrix, row, axis=0).tofile(tmp_file)
+            os.replace(tmp_file, self.data_file)
+            del index["roll_nos"][row]
+            del index["students"][row]
+            self._write_index(index)
+
+    def clear(self):
+        self.rebuild([])
@@ -0,0 +1,204 @@
+# backend/face_detectors.py (Pluggable face detectors for the verification pipeline)
+import logging
+import math
+import os
+import cv2
+import numpy as np
+import torch
+from torchvision.ops import nms
+
+from backend.model_registry import PROJECT_ROOT, model_registry
+
+logger = logging.getLogger(__name__)
+
+# Column layout BYTETracker consumes: x1, y1, x2, y2, confidence, class id
+DETECTION_COLUMNS = 6
+# One grayscale image per hall, named <hall>.png; non-zero pixels are where faces may appear
+ROI_MASK_DIR = os.path.join(PROJECT_ROOT, "data", "roi_masks")
+
+
+def _empty_detections():
+    return np.empty((0, DETECTION_COLUMNS), dtype=np.float32)
+
+
+class FaceDetector:
+    """
+    Common interface: detect_batch() takes a list of BGR frames and returns one
+    float32 (N, 6) array per frame, already in BYTETracker layout
+    [x1, y1, x2, y2, confidence, 0], so no per-face objects are built downstream.
+    """
+
+    name = None
+
+    def detect_batch(self, frames):
+        raise NotImplementedError
+
+    def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+
+class RetinaFaceDetector(FaceDetector):
+    """DeepFace's RetinaFace client, called directly so faces are not aligned and cropped for nothing."""
+
+    name = "retinaface"
+
+    def __init__(self):
+        self.model = model_registry.get("retinaface")
+
+    def detect_batch(self, frames):
+        # RetinaFace has no batched entry point, so frames go through one at a time
+        results = []
+        for frame in frames:
+            regions = self.model.detect_faces(frame)
+            if not regions:
+                results.append(_empty_detections())
+                continue
+            detections = np.array([(r.x, r.y, r.w, r.h, r.confidence or 0.0) for r in regions], dtype=np.float32)
+            detections[:, 2:4] += detections[:, 0:2]  # x, y, w, h -> x1, y1, x2, y2
+            results.append(np.hstack([detections, np.zeros((len(detections), 1), dtype=np.float32)]))
+        return results
+
+
+class YoloFaceDetector(FaceDetector):
+    """YOLOv8-face via ultralytics; a list of frames goes through the network as one batch."""
+
+    name = "yolov8-face"
+
+    def __init__(self, confidence=0.1, image_size=640):
+        self.model = model_registry.get("yolov8-face")
+        # Keep low-score boxes: BYTETracker uses them in its second association round
+        self.confidence = confidence
+        self.image_size = image_size
+
+    def detect_batch(self, frames):
+        if not frames:
+            return []
+        results = self.model(frames, verbose=False, conf=self.confidence, imgsz=self.image_size)
+        detections = []
+        for result in results:
+            data = result.boxes.data.cpu().numpy().astype(np.float32, copy=False)
+            data[:, 5] = 0  # Single-class model; pin the id BYTETracker expects
+            detections.append(data)
+        return detections
+
+
+def tile_grid(height, width, rows, cols, overlap):
+    """(x1, y1, x2, y2) tiles of equal size covering the frame, neighbours sharing `overlap` of a tile."""
+    tile_w = min(width, math.ceil(width / (cols - (cols - 1) * overlap)))
+    tile_h = min(height, math.ceil(height / (rows - (rows - 1) * overlap)))
+    xs = np.linspace(0, width - tile_w, cols).astype(int)
+    ys = np.linspace(0, height - tile_h, rows).astype(int)
+    return [(int(x), int(y), int(x) + tile_w, int(y) + tile_h) for y in ys for x in xs]
+
+
+def load_roi_mask(hall, folder=ROI_MASK_DIR):
+    """The hall's region-of-interest mask as a boolean array, or None when the hall has none."""
+    if not hall:
+        return None
+    path = os.path.join(folder, f"{hall}.png")
+    if not os.path.exists(path):
+        return None
+    mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if mask is None:
+        logger.warning(f"Could not read ROI mask {path}; detecting on the whole frame")
+        return None
+    logger.info(f"Using ROI mask {path} ({np.count_nonzero(mask) / mask.size:.0%} of the frame)")
+    return mask > 0
+
+
+class TiledFaceDetector(FaceDetector):
+    """
+    Runs another detector over overlapping tiles so small, distant faces keep
+    enough pixels after the detector's own resize. Tiles from every frame go
+    through the wrapped detector as one batch, optionally together with the whole
+    frame for faces larger than a tile.
+
+    Boxes cut by an inner tile edge are dropped (the overlapping neighbour sees
+    the face whole) and the rest are merged across tiles with NMS. With an ROI
+    mask, every pass is cropped to the mask's bounding box: tiles outside it are
+    never run, the whole-frame pass only covers the box (and is skipped when one
+    tile already does), and boxes centred outside the mask are dropped.
+    """
+
+    def __init__(self, detector, rows=2, cols=2, overlap=0.2, iou_threshold=0.5,
+                 full_frame=True, roi_mask=None, edge_margin=2):
+        self.detector = detector
+        self.name = f"{detector.name}-tiled"
+        self.rows, self.cols, self.overlap = rows, cols, overlap
+        self.iou_threshold = iou_threshold
+        self.full_frame = full_frame and rows * cols > 1
+        self.roi_mask = roi_mask
+        self.edge_margin = edge_margin
+        self._layouts = {}
+
+    def _layout(self, height, width):
+        """
+        Tiles, the ROI mask and the region every pass is confined to (the mask's bounding
+        box, else the frame) for one frame size, computed once. The whole-region pass is
+        listed among the tiles when it is needed.
+        """
+        key = (height, width)
+        if key not in self._layouts:
+            mask = None
+            region = (0, 0, width, height)
+            tiles = tile_grid(height, width, self.rows, self.cols, self.overlap)
+            if self.roi_mask is not None:
+                mask = cv2.resize(self.roi_mask.astype(np.uint8), (width, height), interpolation=cv2.INTER_NEAREST) > 0
+                ys, xs = np.nonzero(mask)
+                if len(xs):
+                    region = (int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1)
+                # Masked-out margins are never handed to the detector
+                tiles = [(max(x1, region[0]), max(y1, region[1]), min(x2, region[2]), min(y2, region[3]))
+                         for x1, y1, x2, y2 in tiles if mask[y1:y2, x1:x2].any()]
+            if self.full_frame and region not in tiles and (mask is None or mask.any()):
+                tiles.append(region)
+            self._layouts[key] = (tiles, mask, region)
+        return self._layouts[key]
+
+    def detect_batch(self, frames):
+        crops, origins = [], []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            tiles, _, _ = self._layout(height, width)
+            for x1, y1, x2, y2 in tiles:
+                crops.append(frame[y1:y2, x1:x2])  # A view; no pixels are copied
+                origins.append((i, x1, y1, x2, y2))
+
+        per_frame = [[] for _ in frames]
+        for (i, x1, y1, x2, y2), detections in zip(origins, self.detector.detect_batch(crops)):
+            if not len(detections):
+                continue
+            _, _, (rx1, ry1, rx2, ry2) = self._layout(*frames[i].shape[:2])
+            # Only edges inside the region cut faces a neighbouring tile sees whole
+            keep = np.ones(len(detections), dtype=bool)
+            if x1 > rx1: keep &= detections[:, 0] > self.edge_margin
+            if y1 > ry1: keep &= detections[:, 1] > self.edge_margin
+            if x2 < rx2: keep &= detections[:, 2] < (x2 - x1) - self.edge_margin
+            if y2 < ry2: keep &= detections[:, 3] < (y2 - y1) - self.edge_margin
+            detections = detections[keep]
+            detections[:, [0, 2]] += x1
+            detections[:, [1, 3]] += y1
+            per_frame[i].append(detections)
+
+        return [self._merge(np.concatenate(found) if found else _empty_detections(), frame.shape[:2])
+                for found, frame in zip(per_frame, frames)]
+
+    def _merge(self, detections, frame_shape):
+        _, mask, _ = self._layout(*frame_shape)
+        if mask is not None and len(detections):
+            cx = ((detections[:, 0] + detections[:, 2]) / 2).astype(int).clip(0, frame_shape[1] - 1)
+            cy = ((detections[:, 1] + detections[:, 3]) / 2).astype(int).clip(0, frame_shape[0] - 1)
+            detections = detections[mask[cy, cx]]
+        if len(detections) > 1:
+            keep = nms(torch.from_numpy(detections[:, :4]), torch.from_numpy(detections[:, 4]), self.iou_threshold)
+            detections = detections[keep.numpy()]
+        return detections
+
+
+FACE_DETECTORS = {cls.name: cls for cls in (RetinaFaceDetector, YoloFaceDetector)}
+
+
+def create_face_detector(name="retinaface"):
+    if name not in FACE_DETECTORS:
+        raise ValueError(f"Unknown face detector '{name}', expected one of {tuple(FACE_DETECTORS)}")
+    return FACE_DETECTORS[name]()
@@ -0,0 +1,142 @@
+# backend/frame_ring.py (Zero-copy frame ring in shared memory)
+import numpy as np
+from multiprocessing import shared_memory
+
+MAGIC = 0x4E4554524152494E  # "NETRARIN"
+HEADER_WORDS = 4  # magic, slot count, slot bytes, last written sequence number
+SLOT_HEADER_WORDS = 5  # sequence number, height, width, channels, nbytes
+ALIGN = 64
+
+
+def _aligned(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+class SharedFrameRing:
+    """
+    Fixed-size slots of uint8 frames in one multiprocessing.shared_memory block.
+    A single producer copies each frame in once; any number of readers in any
+    process get numpy views straight onto the slot, with no further copies.
+
+    Every write gets the next sequence number and lands in slot seq % slots.
+    A slot's sequence number is zeroed while it is being written and set last,
+    so a reader can tell whether the slot still holds the frame it asked for
+    (`is_current`) both before and after using the view.
+    """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        # frombuffer holds a buffer export, so the mapping cannot be unmapped under a live view
+        self.data = np.frombuffer(shm.buf, dtype=np.uint8)
+        self.header = self._words(0, HEADER_WORDS)
+        if int(self.header[0]) != MAGIC:
+            raise ValueError(f"Shared memory block '{shm.name}' is not a frame ring")
+        self.slots = int(self.header[1])
+        self.slot_bytes = int(self.header[2])
+        self.slot_stride = _aligned(SLOT_HEADER_WORDS * 8) + _aligned(self.slot_bytes)
+        self.slot_headers = [self._words(self._slot_offset(i), SLOT_HEADER_WORDS) for i in range(self.slots)]
+
+    @classmethod
+    def create(cls, slots=8, slot_bytes=1920 * 1080 * 3, name=None):
+        stride = _aligned(SLOT_HEADER_WORDS * 8) + _aligned(slot_bytes)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_aligned(HEADER_WORDS * 8) + slots * stride)
+        header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        header[:] = (MAGIC, slots, slot_bytes, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _words(self, offset, count):
+        return self.data[offset:offset + count * 8].view(np.uint64)
+
+    def _slot_offset(self, index):
+        return _aligned(HEADER_WORDS * 8) + index * self.slot_stride
+
+    def latest_seq(self):
+        return int(self.header[3])
+
+    # --- Producer ---
+
+    def write(self, frame):
+        """Copies the frame into the next slot and returns its sequence number, or None if it does not fit."""
+        frame = np.ascontiguousarray(frame)
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes or frame.ndim not in (2, 3):
+            return None
+        seq = self.latest_seq() + 1
+        index = seq % self.slots
+        slot_header = self.slot_headers[index]
+        slot_header[0] = 0  # Readers of the old frame now see it as gone
+        data_offset = self._slot_offset(index) + _aligned(SLOT_HEADER_WORDS * 8)
+        self.data[data_offset:data_offset + frame.nbytes] = frame.reshape(-1)
+        channels = frame.shape[2] if frame.ndim == 3 else 0
+        slot_header[1:] = (frame.shape[0], frame.shape[1], channels, frame.nbytes)
+        slot_header[0] = seq
+        self.header[3] = seq
+        return seq
+
+    # --- Readers ---
+
+    def is_current(self, seq):
+        return int(self.slot_headers[seq % self.slots][0]) == seq
+
+    def view(self, seq):
+        """
+        A read-only view of frame `seq`, or None once it has been overwritten. The view stays
+        valid only until the producer laps the ring; copy it, or check is_current() after use.
+        """
+        slot_header = self.slot_headers[seq % self.slots]
+        if int(slot_header[0]) != seq:
+            return None
+        height, width, channels, _ = (int(v) for v in slot_header[1:])
+        shape = (height, width, channels) if channels else (height, width)
+        data_offset = self._slot_offset(seq % self.slots) + _aligned(SLOT_HEADER_WORDS * 8)
+        frame = self.data[data_offset:data_offset + int(np.prod(shape))].reshape(shape)
+        frame.flags.writeable = False
+        return frame
+
+    def reader(self):
+        return RingReader(self)
+
+    def close(self):
+        self.data = self.header = None
+        self.slot_headers = []
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A reader still holds a view; the mapping is released once the last view is freed
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingReader:
+    """One consumer's cursor into a SharedFrameRing; readers never affect the producer or each other."""
+
+    __slots__ = ("ring", "cursor", "missed")
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.cursor = ring.latest_seq()
+        self.missed = 0
+
+    def next(self):
+        """
+        (seq, view) for the newest unread frame; None when nothing new has been written or
+        it was overwritten before it could be viewed. Skipped frames count in `missed`.
+        """
+        head = self.ring.latest_seq()
+        if head <= self.cursor:
+            return None
+        self.missed += head - self.cursor - 1
+        self.cursor = seq = head
+        frame = self.ring.view(seq)
+        if frame is None:
+            self.missed += 1
+            return None
+        return seq, frame
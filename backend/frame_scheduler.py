@@ -0,0 +1,45 @@
+# backend/frame_scheduler.py (Adaptive analysis stride for the verification pipeline)
+import math
+
+
+class AdaptiveFrameSkip:
+    """
+    Chooses how many source frames to advance between analysed frames.
+
+    The stride never goes below what the measured detection + embedding cost can
+    sustain in real time, and never above `latency_budget` worth of frames, which
+    bounds how long a newly arrived face can go unseen. In between:
+      - faces still unidentified  -> as fast as the stage latency allows
+      - everyone in view known    -> halfway, to keep tracker associations tight
+      - nobody in view            -> the full latency budget
+    """
+
+    def __init__(self, fps=30.0, latency_budget=0.5, max_skip=15, smoothing=0.2):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.max_stride = max(1, min(int(latency_budget * self.fps), max_skip))
+        self.smoothing = smoothing
+        self.detection_seconds = 0.0
+        self.embedding_seconds_per_face = 0.0
+        self.stride = 1
+
+    def _smooth(self, current, sample):
+        return sample if current == 0.0 else current + self.smoothing * (sample - current)
+
+    def record(self, detection_seconds, embedding_seconds=0.0, embedded_faces=0):
+        """Feeds in the stage timings of one analysed frame."""
+        self.detection_seconds = self._smooth(self.detection_seconds, detection_seconds)
+        if embedded_faces:
+            self.embedding_seconds_per_face = self._smooth(self.embedding_seconds_per_face,
+                                                           embedding_seconds / embedded_faces)
+
+    def next_stride(self, active_tracks, unidentified_tracks):
+        expected_cost = self.detection_seconds + self.embedding_seconds_per_face * unidentified_tracks
+        min_stride = max(1, min(math.ceil(expected_cost * self.fps), self.max_stride))
+
+        if unidentified_tracks:
+            self.stride = min_stride
+        elif active_tracks:
+            self.stride = max(min_stride, (min_stride + self.max_stride) // 2)
+        else:
+            self.stride = self.max_stride
+        return self.stride
@@ -0,0 +1,542 @@
+# backend/gallery.py (Vectorized face gallery for the verification pipeline)
+import hashlib
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def l2_normalize(vectors):
+    """Row-wise L2 normalisation. Zero rows are left as zeros instead of producing NaNs."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def gallery_fingerprint(roll_nos, matrix):
+    """Hash of the roster and its vectors, used to tell whether a persisted index is stale."""
+    digest = hashlib.sha1()
+    digest.update("\n".join(map(str, roll_nos)).encode())
+    digest.update(np.ascontiguousarray(matrix).tobytes())
+    return digest.hexdigest()
+
+
+def _sorted_top_k(distances, candidates, k):
+    """Picks the k smallest distances from one candidate set, padding with -1 / inf when there are fewer."""
+    indices = np.full(k, -1, dtype=np.int64)
+    top = np.full(k, np.inf, dtype=np.float32)
+    found = min(k, len(candidates))
+    if found == 0:
+        return indices, top
+    best = np.argpartition(distances, found - 1)[:found] if found < len(candidates) else np.arange(len(candidates))
+    best = best[np.argsort(distances[best])]
+    indices[:found] = candidates[best]
+    top[:found] = distances[best]
+    return indices, top
+
+
+class ExactIndex:
+    """Brute-force search over the whole gallery matrix. Always returns the true nearest neighbours."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    # Live roster changes only need the new matrix; there is no structure to maintain
+    def add(self, matrix):
+        self.matrix = matrix
+
+    def update(self, matrix, row):
+        self.matrix = matrix
+
+    def remove(self, matrix, row):
+        self.matrix = matrix
+
+    def search(self, queries, k):
+        """Returns (indices, distances), both (N, k) sorted ascending; padded with -1 / inf."""
+        distances = 1.0 - queries @ self.matrix.T
+        if k < len(self.matrix):
+            # argpartition keeps this O(N) per query regardless of gallery size
+            indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            indices = np.broadcast_to(np.arange(len(self.matrix)), distances.shape)
+        top = np.take_along_axis(distances, indices, axis=1)
+        order = np.argsort(top, axis=1)
+        return np.take_along_axis(indices, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index in pure NumPy. The gallery is clustered with spherical
+    k-means into `n_lists` cells; a query only scans the `n_probe` cells whose
+    centroids are closest to it, so cost drops from O(N) to roughly O(N * n_probe / n_lists).
+    """
+
+    def __init__(self, matrix, centroids, assignments, n_probe=8):
+        self.matrix = matrix
+        self.centroids = centroids
+        self.n_probe = max(1, min(n_probe, len(centroids)))
+        self._set_lists(assignments)
+
+    def _set_lists(self, assignments):
+        self.assignments = np.asarray(assignments, dtype=np.int64)
+        # Row ids grouped by cell, so each cell is a contiguous slice of `order`
+        self.order = np.argsort(self.assignments, kind="stable")
+        self.offsets = np.searchsorted(self.assignments[self.order], np.arange(len(self.centroids) + 1))
+
+    @staticmethod
+    def _nearest_centroid(matrix, centroids, chunk_size=8192):
+        assignments = np.empty(len(matrix), dtype=np.int64)
+        for start in range(0, len(matrix), chunk_size):
+            block = matrix[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def add(self, matrix):
+        """Assigns the rows appended to the gallery to their nearest existing cells."""
+        self.matrix = matrix
+        new_assignment = self._nearest_centroid(matrix[len(self.assignments):], self.centroids)
+        self._set_lists(np.concatenate([self.assignments, new_assignment]))
+
+    def update(self, matrix, row):
+        self.matrix = matrix
+        assignments = self.assignments.copy()
+        assignments[row] = self._nearest_centroid(matrix[row:row + 1], self.centroids)[0]
+        self._set_lists(assignments)
+
+    def remove(self, matrix, row):
+        self.matrix = matrix
+        self._set_lists(np.delete(self.assignments, row))
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, n_probe=8, iterations=15, seed=0):
+        """Clusters the gallery with spherical k-means. n_lists defaults to ~sqrt(N)."""
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, min(n_lists or int(np.sqrt(len(matrix))), len(matrix)))
+        centroids = matrix[rng.choice(len(matrix), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = cls._nearest_centroid(matrix, centroids)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            non_empty = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums[non_empty] = np.add.reduceat(matrix[order], starts[non_empty], axis=0)
+            # Re-seed cells that lost all their members
+            sums[~non_empty] = matrix[rng.choice(len(matrix), int((~non_empty).sum()))]
+            centroids = l2_normalize(sums)
+
+        return cls(matrix, centroids, cls._nearest_centroid(matrix, centroids), n_probe=n_probe)
+
+    def search(self, queries, k):
+        """Returns (indices, distances), both (N, k) sorted ascending; padded with -1 / inf."""
+        coarse = queries @ self.centroids.T
+        if self.n_probe < len(self.centroids):
+            probes = np.argpartition(-coarse, self.n_probe - 1, axis=1)[:, :self.n_probe]
+        else:
+            probes = np.broadcast_to(np.arange(len(self.centroids)), coarse.shape)
+
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([self.order[self.offsets[cell]:self.offsets[cell + 1]] for cell in probes[i]])
+            indices[i], distances[i] = _sorted_top_k(1.0 - self.matrix[candidates] @ query, candidates, k)
+        return indices, distances
+
+    def save(self, path, fingerprint):
+        # Write to a temp file first so a concurrent pipeline never reads a half-written index
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, assignments=self.assignments,
+                 n_probe=self.n_probe, fingerprint=fingerprint)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, matrix, fingerprint, n_probe=None):
+        """Returns the persisted index, or None when it is missing or was built for a different roster."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    return None
+                return cls(matrix, data["centroids"], data["assignments"],
+                           n_probe=n_probe if n_probe is not None else int(data["n_probe"]))
+        except Exception as e:
+            logger.warning(f"Could not load gallery index from {path}: {e}")
+            return None
+
+
+def resident_nbytes(array):
+    """Bytes an array pins in this process; a memmap lives in the page cache shared by every pipeline."""
+    return 0 if isinstance(array, np.memmap) else array.nbytes
+
+
+class QuantizedIndex:
+    """
+    Coarse scan over a compressed copy of the gallery, then exact re-ranking.
+
+    "float16" halves and "int8" (symmetric, one scale per vector) quarters the
+    private memory of the scanned matrix. The `rerank` best coarse candidates are
+    re-scored against `source`, the full-precision rows. For a store-backed gallery
+    that is the shared, read-only memmap, so only those few rows are ever read and
+    the pipeline keeps no float32 copy of its own.
+    """
+
+    # Rows decoded per step; small enough that the float32 block stays in cache for the product
+    CHUNK_ROWS = 128
+
+    def __init__(self, source, precision="int8", rerank=32):
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"Unsupported gallery quantization '{precision}'")
+        self.precision = precision
+        self.rerank = rerank
+        self.source = source
+        self.codes, self.scales = self._quantize(source)
+
+    def _quantize(self, rows):
+        # Quantised chunk by chunk, so a memmap source is never pulled into memory as float32
+        codes = np.empty(rows.shape, dtype=np.float16 if self.precision == "float16" else np.int8)
+        scales = np.empty(len(rows), dtype=np.float32) if self.precision == "int8" else None
+        for start in range(0, len(rows), 4096):
+            block = np.asarray(rows[start:start + 4096], dtype=np.float32)
+            if scales is None:
+                codes[start:start + len(block)] = block
+                continue
+            block_scales = np.abs(block).max(axis=1) / 127.0
+            block_scales[block_scales == 0] = 1.0
+            codes[start:start + len(block)] = np.clip(np.rint(block / block_scales[:, None]), -127, 127)
+            scales[start:start + len(block)] = block_scales
+        return codes, scales
+
+    @property
+    def resident_nbytes(self):
+        """Private memory of this index: the codes, the scales and the source unless it is a shared memmap."""
+        scales = self.scales.nbytes if self.scales is not None else 0
+        return self.codes.nbytes + scales + resident_nbytes(self.source)
+
+    def _coarse_similarities(self, queries):
+        # Decode into one reused buffer so BLAS does the product without a full float32 copy
+        similarities = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        decoded = np.empty((min(self.CHUNK_ROWS, len(self.codes)), self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.codes), self.CHUNK_ROWS):
+            block = self.codes[start:start + self.CHUNK_ROWS]
+            np.copyto(decoded[:len(block)], block, casting="unsafe")
+            np.matmul(queries, decoded[:len(block)].T, out=similarities[:, start:start + len(block)])
+        if self.scales is not None:
+            similarities *= self.scales
+        return similarities
+
+    def search(self, queries, k):
+        """Returns (indices, distances), both (N, k) sorted ascending; padded with -1 / inf."""
+        similarities = self._coarse_similarities(queries)
+        n_candidates = min(max(k, self.rerank), len(self.codes))
+        if n_candidates < len(self.codes):
+            shortlist = np.argpartition(-similarities, n_candidates - 1, axis=1)[:, :n_candidates]
+        else:
+            shortlist = np.broadcast_to(np.arange(len(self.codes)), similarities.shape)
+
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.sort(shortlist[i])
+            exact = 1.0 - np.asarray(self.source[candidates], dtype=np.float32) @ query
+            indices[i], distances[i] = _sorted_top_k(exact, candidates, k)
+        return indices, distances
+
+    def add(self, matrix):
+        self.source = matrix
+        codes, scales = self._quantize(matrix[len(self.codes):])
+        self.codes = np.concatenate([self.codes, codes])
+        if scales is not None:
+            self.scales = np.concatenate([self.scales, scales])
+
+    def update(self, matrix, row):
+        self.source = matrix
+        codes, scales = self._quantize(matrix[row:row + 1])
+        self.codes[row] = codes[0]
+        if scales is not None:
+            self.scales[row] = scales[0]
+
+    def remove(self, matrix, row):
+        self.source = matrix
+        self.codes = np.delete(self.codes, row, axis=0)
+        if self.scales is not None:
+            self.scales = np.delete(self.scales, row)
+
+
+INDEX_TYPES = ("exact", "ivf", "float16", "int8")
+QUANTIZED_INDEXES = ("float16", "int8")
+
+
+class EmbeddingGallery:
+    """
+    Holds every enrolled embedding as one contiguous, L2-normalised float32 matrix
+    with a parallel array of roll numbers, so matching a face is a single
+    matrix-vector product instead of one scipy `cosine` call per student.
+    """
+
+    def __init__(self, student_db: dict, embedding_key: str = "adaface_embedding",
+                 index: str = "exact", index_path: str = None, n_probe: int = 8, rerank: int = 32):
+        """
+        index selects the search backend: "exact" (brute force), "ivf" (approximate)
+        or "float16" / "int8" (quantized scan with exact re-ranking of `rerank` candidates).
+        An IVF index is persisted at index_path and reused on the next start as long
+        as the roster has not changed.
+        """
+        roll_nos, vectors, student_classes, departments = [], [], [], []
+        for roll_no, data in student_db.items():
+            embedding = data.get(embedding_key)
+            if embedding is None:
+                logger.warning(f"Student {roll_no} has missing or invalid embedding")
+                continue
+            roll_nos.append(roll_no)
+            vectors.append(np.asarray(embedding, dtype=np.float32).ravel())
+            student_classes.append(data.get("student_class"))
+            departments.append(data.get("department"))
+
+        matrix = l2_normalize(np.stack(vectors)) if vectors else np.empty((0, 0), dtype=np.float32)
+        self._setup(embedding_key, roll_nos, matrix, student_classes, departments, index, index_path, n_probe, rerank)
+
+    @classmethod
+    def from_arrays(cls, roll_nos, matrix, student_db: dict, embedding_key: str = "adaface_embedding",
+                    index: str = "exact", index_path: str = None, n_probe: int = 8, rerank: int = 32, store=None):
+        """
+        Wraps an already L2-normalised matrix, e.g. a read-only np.memmap from the
+        embedding store, without copying it. student_db supplies class and department.
+        When `store` (the EmbeddingStore behind the memmap) is given, live roster
+        changes re-map the store file instead of copying the gallery into memory.
+        """
+        gallery = cls.__new__(cls)
+        student_classes = [student_db.get(roll_no, {}).get("student_class") for roll_no in roll_nos]
+        departments = [student_db.get(roll_no, {}).get("department") for roll_no in roll_nos]
+        if matrix.dtype != np.float32 and index not in QUANTIZED_INDEXES:
+            # Half-precision stores are upcast once here rather than on every query;
+            # quantized indexes only re-rank a few rows, so they read them straight from the store
+            matrix = matrix.astype(np.float32)
+        gallery._setup(embedding_key, roll_nos, matrix, student_classes, departments, index, index_path, n_probe, rerank)
+        gallery.store = store
+        return gallery
+
+    def _setup(self, embedding_key, roll_nos, matrix, student_classes, departments, index, index_path, n_probe, rerank):
+        self.store = None
+        # Writable rows with spare capacity, created on the first change made in memory; matrix is then a view on it
+        self._buffer = None
+        self.embedding_key = embedding_key
+        self.roll_nos = np.array(roll_nos, dtype=object)
+        # Parallel to roll_nos, used to cut per-class shards without touching the database
+        self.student_classes = np.array(student_classes, dtype=object)
+        self.departments = np.array(departments, dtype=object)
+        self.matrix = matrix if len(self.roll_nos) else np.empty((0, 0), dtype=np.float32)
+        self._rows = {roll_no: row for row, roll_no in enumerate(self.roll_nos)}
+        self.index = self._build_index(index, index_path, n_probe, rerank)
+        self._shards = {}
+
+    def _build_index(self, index, index_path, n_probe, rerank):
+        if index not in INDEX_TYPES:
+            raise ValueError(f"Unknown gallery index '{index}', expected one of {INDEX_TYPES}")
+        if index == "exact" or len(self) == 0:
+            return ExactIndex(self.matrix)
+        if index in ("float16", "int8"):
+            return QuantizedIndex(self.matrix, precision=index, rerank=rerank)
+
+        fingerprint = gallery_fingerprint(self.roll_nos, self.matrix)
+        ivf = IVFIndex.load(index_path, self.matrix, fingerprint, n_probe=n_probe)
+        if ivf is not None:
+            logger.info(f"Loaded IVF gallery index from {index_path}")
+            return ivf
+
+        ivf = IVFIndex.build(self.matrix, n_probe=n_probe)
+        logger.info(f"Built IVF gallery index with {len(ivf.centroids)} lists for {len(self)} identities")
+        if index_path:
+            ivf.save(index_path, fingerprint)
+        return ivf
+
+    def __len__(self):
+        return len(self.roll_nos)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    def _remapped_store(self, snapshot, changed_vectors):
+        """
+        The embedding store's memmap when it holds exactly this gallery's rows, else None.
+        The store applies every roster change to its file before (or just after) the change is
+        logged, so normally a store-backed gallery can follow it without copying anything.
+        `changed_vectors` maps rows rewritten by the change to their new vectors; the store
+        must already hold those too.
+        """
+        if (snapshot is None or not isinstance(snapshot.matrix, np.memmap)
+                or snapshot.matrix.dtype != self.matrix.dtype or snapshot.roll_nos != list(self.roll_nos)):
+            return None
+        if any(not np.allclose(snapshot.matrix[row], vector, atol=1e-3) for row, vector in changed_vectors.items()):
+            return None
+        return snapshot.matrix
+
+    def _reserve(self, rows, dim):
+        """Points matrix at a writable buffer with room for `rows` rows, growing it geometrically."""
+        if self._buffer is not None and len(self._buffer) >= rows:
+            return
+        count = len(self.matrix)
+        if self._buffer is None and isinstance(self.matrix, np.memmap):
+            logger.info(f"Embedding store out of step with the gallery; copying {count} rows into memory")
+        buffer = np.empty((max(rows, 2 * count, 16), dim), dtype=np.float32)
+        if count:
+            buffer[:count] = self.matrix
+        self._buffer = buffer
+        self.matrix = buffer[:count]
+
+    def apply_changes(self, upserts, removals=()):
+        """
+        Applies a whole roster change set in one pass: `upserts` maps roll_no to
+        (embedding, student_class, department), `removals` lists roll numbers to drop
+        (unknown ones are ignored). A store-backed gallery re-maps the store once, after
+        every row is in place; otherwise the rows are written into the in-memory buffer.
+        """
+        removed_rows = sorted(self._rows[roll_no] for roll_no in set(removals) if roll_no in self._rows)
+        if not upserts and not removed_rows:
+            return
+        keep = np.ones(len(self), dtype=bool)
+        keep[removed_rows] = False
+        self.roll_nos = self.roll_nos[keep]
+        self.student_classes = self.student_classes[keep]
+        self.departments = self.departments[keep]
+        self._rows = {roll_no: row for row, roll_no in enumerate(self.roll_nos)}
+
+        snapshot = self.store.load() if self.store is not None and isinstance(self.matrix, np.memmap) else None
+        updated, appended = {}, []
+        for roll_no, (embedding, student_class, department) in upserts.items():
+            vector = l2_normalize(np.asarray(embedding, dtype=np.float32).ravel())
+            row = self._rows.get(roll_no)
+            if row is None:
+                appended.append((roll_no, vector, student_class, department))
+            else:
+                self.student_classes[row] = student_class
+                self.departments[row] = department
+                updated[row] = vector
+        if appended and snapshot is not None:
+            # New rows go in the order the store appended them, so its file can be mapped as is
+            positions = {roll_no: position for position, roll_no in enumerate(snapshot.roll_nos)}
+            appended.sort(key=lambda new: positions.get(new[0], len(positions)))
+        kept = len(self.roll_nos)
+        for roll_no, _, student_class, department in appended:
+            self._rows[roll_no] = len(self.roll_nos)
+            self.roll_nos = np.append(self.roll_nos, np.array([roll_no], dtype=object))
+            self.student_classes = np.append(self.student_classes, np.array([student_class], dtype=object))
+            self.departments = np.append(self.departments, np.array([department], dtype=object))
+
+        changed_vectors = dict(updated)
+        changed_vectors.update((kept + i, new[1]) for i, new in enumerate(appended))
+        remapped = self._remapped_store(snapshot, changed_vectors)
+        if remapped is not None:
+            self.matrix = remapped
+        else:
+            dim = self.matrix.shape[1] if self.matrix.size else len(next(iter(changed_vectors.values())))
+            self._reserve(max(len(self.matrix), len(self)), dim)
+            # Compact the kept rows inside the buffer rather than building a new matrix
+            self._buffer[:kept] = self._buffer[:len(keep)][keep]
+            for row, vector in changed_vectors.items():
+                self._buffer[row] = vector
+            self.matrix = self._buffer[:len(self)]
+
+        for row in reversed(removed_rows):
+            self.index.remove(self.matrix, row)
+        for row in updated:
+            self.index.update(self.matrix, row)
+        if appended:
+            self.index.add(self.matrix)
+        self._shards.clear()
+
+    def upsert(self, roll_no, embedding, student_class=None, department=None):
+        """Adds or replaces a single student in place, without reloading the rest of the gallery."""
+        self.apply_changes({roll_no: (embedding, student_class, department)})
+
+    def remove(self, roll_no):
+        """Drops a single student; a no-op when the roll number is not in the gallery."""
+        self.apply_changes({}, [roll_no])
+
+    def shard(self, student_class, department=None):
+        """
+        Sub-gallery holding only the students of one class (and department, when given).
+        Shards are small, so they always use exact search; they are cached per key.
+        """
+        key = (student_class, department)
+        if key not in self._shards:
+            mask = self.student_classes == student_class
+            if department:
+                mask &= self.departments == department
+            members = {
+                self.roll_nos[i]: {self.embedding_key: self.matrix[i],
+                                   "student_class": self.student_classes[i], "department": self.departments[i]}
+                for i in np.flatnonzero(mask)
+            }
+            self._shards[key] = EmbeddingGallery(members, self.embedding_key)
+        return self._shards[key]
+
+    def _top_k(self, queries, k):
+        """Row indices and cosine distances of the k nearest entries per query, sorted ascending."""
+        return self.index.search(queries, k)
+
+    def search(self, embeddings, k: int = 1):
+        """
+        Matches an (N, D) block of query embeddings; with the exact index this is one GEMM.
+        Returns (roll_nos, distances), both (N, k) and sorted by ascending cosine distance.
+        Slots beyond the gallery size are filled with None / inf.
+        """
+        queries = l2_normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        roll_nos = np.full((len(queries), k), None, dtype=object)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        k_found = min(k, len(self))
+        if k_found == 0 or len(queries) == 0:
+            return roll_nos, distances
+
+        indices, top = self._top_k(queries, k_found)
+        found = indices >= 0
+        roll_nos[:, :k_found][found] = self.roll_nos[indices[found]]
+        distances[:, :k_found] = top
+        return roll_nos, distances
+
+    def match(self, embedding):
+        """
+        Returns (roll_no, best_distance, second_best_distance) using cosine distance.
+        roll_no is None when the gallery is empty.
+        """
+        roll_nos, distances = self.search(embedding, k=2)
+        return roll_nos[0, 0], float(distances[0, 0]), float(distances[0, 1])
+
+    def assign(self, embeddings, threshold: float, k: int = 5, exclude=()):
+        """
+        One-to-one assignment of N simultaneous faces to students, so two faces
+        in the same frame can never claim the same roll number.
+
+        Candidates are the union of every query's top-k, and the Hungarian solve
+        reuses BYTETracker's `linear_assignment`. Roll numbers in `exclude` (already
+        taken by another face of the frame, e.g. in a shard) are never assigned.
+        Returns (roll_nos, distances), both length N; queries left unassigned get
+        roll_no None and keep their nearest distance for logging.
+        """
+        from yolox.tracker.matching import linear_assignment
+
+        queries = l2_normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        roll_nos = np.full(len(queries), None, dtype=object)
+        distances = np.full(len(queries), np.inf, dtype=np.float32)
+        if len(self) == 0 or len(queries) == 0:
+            return roll_nos, distances
+
+        # Widen the search so excluded students cannot crowd out every candidate
+        indices, top = self._top_k(queries, min(k + len(exclude), len(self)))
+        distances[:] = top[:, 0]
+        candidates = np.unique(indices[indices >= 0])
+        if len(exclude):
+            candidates = candidates[~np.isin(self.roll_nos[candidates], list(exclude))]
+            if not len(candidates):
+                return roll_nos, distances
+        cost = 1.0 - queries @ self.matrix[candidates].T
+
+        matches, _, _ = linear_assignment(cost.astype(np.float64), thresh=threshold)
+        for query_idx, candidate_idx in matches:
+            roll_nos[query_idx] = self.roll_nos[candidates[candidate_idx]]
+            distances[query_idx] = cost[query_idx, candidate_idx]
+        return roll_nos, distances
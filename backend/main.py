@@ -4,6 +4,7 @@ from fastapi import FastAPI
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from . import database_handler
+from .model_registry import model_registry
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +15,11 @@ from .routes import attendance, registration, management, auth, principal, hod,
 # Initialize the database on startup
 database_handler.initialize_database()
 
+# Models load lazily on first use; MODEL_WARMUP (e.g. "adaface,deepface") preloads them in the background
+warmup_models = [name.strip() for name in os.getenv("MODEL_WARMUP", "").split(",") if name.strip()]
+if warmup_models:
+    model_registry.warm_up(warmup_models)
+
 app = FastAPI(title="Project Netra - Final API")
 
 origins = [
@@ -41,4 +47,10 @@ app.include_router(users.router, prefix="/api/users", tags=["User Actions"])
 @app.get("/")
 def read_root():
     """A simple health check endpoint."""
-    return {"status": "Backend is running."}
\ No newline at end of file
+    return {"status": "Backend is running."}
+
+
+@app.get("/api/models")
+def model_status():
+    """Reports which models are loaded, their load time and resident-memory growth."""
+    return model_registry.stats()
\ No newline at end of file
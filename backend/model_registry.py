@@ -0,0 +1,121 @@
+# backend/model_registry.py (Lazy, process-wide model registry)
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ADAFACE_MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "adaface_ir101_webface12m.ckpt")
+YOLO_FACE_MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "yolov8n-face.pt")
+
+
+def _resident_memory_bytes():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+class ModelRegistry:
+    """
+    Loads each recognizer/detector on first use and hands the same instance to every
+    route and pipeline in the process. Heavy imports (torch weights, TensorFlow via
+    DeepFace) live inside the factories, so importing this module is cheap.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._stats = {}
+        # Loads are serialised so the resident-memory delta can be attributed to one model.
+        # Re-entrant so a factory may itself fetch another model from the registry.
+        self._load_lock = threading.RLock()
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"No model registered under '{name}'")
+
+        with self._load_lock:
+            # Another thread may have finished loading it while we waited
+            if name in self._instances:
+                return self._instances[name]
+            rss_before = _resident_memory_bytes()
+            start = time.perf_counter()
+            instance = self._factories[name]()
+            load_seconds = time.perf_counter() - start
+            rss_after = _resident_memory_bytes()
+
+            rss_delta_mb = (rss_after - rss_before) / 2**20 if rss_before is not None else None
+            self._stats[name] = {"load_seconds": round(load_seconds, 2),
+                                 "rss_delta_mb": round(rss_delta_mb, 1) if rss_delta_mb is not None else None}
+            self._instances[name] = instance
+            logger.info(f"Loaded model '{name}' in {load_seconds:.2f}s (resident memory +{rss_delta_mb or 0:.1f} MB)")
+            return instance
+
+    def warm_up(self, names=None, background=True):
+        """Loads the given models (default: all registered) ahead of the first request."""
+        names = [n for n in (names or self._factories) if n]
+
+        def _load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f"Warm-up of model '{name}' failed: {e}", exc_info=True)
+
+        if not background:
+            _load_all()
+            return None
+        thread = threading.Thread(target=_load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """Load time and resident-memory growth per model; models not loaded yet report loaded=False."""
+        return {name: {"loaded": name in self._instances, **self._stats.get(name, {})} for name in self._factories}
+
+
+# --- Default factories ---
+
+def _load_adaface():
+    from .adaface_model import AdaFaceModel
+    return AdaFaceModel(ADAFACE_MODEL_PATH)
+
+
+def _load_deepface():
+    # Importing DeepFace pulls in TensorFlow; building the model caches its weights inside DeepFace
+    from deepface import DeepFace
+    recognition_model = os.getenv("RECOGNITION_MODEL", "AdaFace")
+    if recognition_model != "AdaFace":  # AdaFace is served by the "adaface" entry, DeepFace does not know it
+        DeepFace.build_model(model_name=recognition_model)
+    return DeepFace
+
+
+def _load_retinaface():
+    # Only the detector is built, so it does not wait on (or fail with) the DeepFace recognizer
+    from deepface import DeepFace
+    return DeepFace.build_model(model_name="retinaface", task="face_detector")
+
+
+def _load_yolo_face():
+    from ultralytics import YOLO
+    return YOLO(YOLO_FACE_MODEL_PATH)
+
+
+model_registry = ModelRegistry()
+model_registry.register("adaface", _load_adaface)
+model_registry.register("deepface", _load_deepface)
+model_registry.register("retinaface", _load_retinaface)
+model_registry.register("yolov8-face", _load_yolo_face)
@@ -0,0 +1,55 @@
+# backend/motion_gate.py (Cheap scene-change test used to skip face detection)
+import cv2
+import numpy as np
+
+GATE_METHODS = ("diff", "mog2")
+
+
+class MotionGate:
+    """
+    Decides whether a frame changed enough to be worth running the detector on.
+    Frames are shrunk to `width` pixels wide grayscale first, so the test costs a
+    fraction of a millisecond even on 1080p input.
+
+    method="diff" compares against the previous checked frame; "mog2" keeps a
+    background model, which also catches slow changes that never differ much
+    between two consecutive frames.
+    """
+
+    def __init__(self, method="diff", width=160, pixel_threshold=25, min_changed_fraction=0.002):
+        if method not in GATE_METHODS:
+            raise ValueError(f"Unknown motion gate method '{method}', expected one of {GATE_METHODS}")
+        self.method = method
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.previous = None
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if method == "mog2" else None
+
+    def reset(self):
+        """Forgets the reference frame or background model, e.g. when a new video starts."""
+        self.previous = None
+        if self.subtractor is not None:
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+
+    def _shrink(self, frame):
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        # Blur away sensor noise and compression artefacts so they do not read as motion
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, frame):
+        small = self._shrink(frame)
+        if self.subtractor is not None:
+            mask = self.subtractor.apply(small)
+            return float(np.count_nonzero(mask)) / mask.size
+
+        previous, self.previous = self.previous, small
+        if previous is None or previous.shape != small.shape:
+            return 1.0
+        changed = cv2.absdiff(small, previous) > self.pixel_threshold
+        return float(np.count_nonzero(changed)) / changed.size
+
+    def is_static(self, frame):
+        return self.changed_fraction(frame) < self.min_changed_fraction
@@ -9,8 +9,14 @@ import time
 import os
 from threading import Event
 import backend.database_handler as database_handler
-from scipy.spatial.distance import cosine
-from deepface import DeepFace
+from backend.best_shot import BestShotBuffer
+from backend.face_detectors import TiledFaceDetector, create_face_detector, load_roi_mask
+from backend.frame_scheduler import AdaptiveFrameSkip
+from backend.gallery import EmbeddingGallery, l2_normalize
+from backend.model_registry import model_registry
+from backend.motion_gate import MotionGate
+from backend.track_state import TrackState
+from backend.video_capture import ThreadedCapture
 from bytetracker import BYTETracker
 
 log_format = '%(asctime)s - %(levelname)s - [%(module)s:%(lineno)d] - %(message)s'
@@ -18,54 +24,194 @@ logging.basicConfig(level=logging.INFO, format=log_format, filename='logs/app.lo
 logger = logging.getLogger(__name__)
 
 class VerificationPipeline:
-    def __init__(self, stop_event: Event, current_lecture: dict = None):
+    def __init__(self, stop_event: Event, current_lecture: dict = None, video_source: str = None):
         self.is_initialized = False
         try:
-            self.video_source = os.getenv("VIDEO_SOURCE", "0")
-            self.recognition_model = os.getenv("RECOGNITION_MODEL", "ArcFace")
+            self.video_source = str(video_source) if video_source is not None else os.getenv("VIDEO_SOURCE", "0")
+            # Must match the model registration used for the stored embeddings (database_handler.EMBEDDING_MODEL)
+            self.recognition_model = os.getenv("RECOGNITION_MODEL", database_handler.EMBEDDING_MODEL)
             self.recognition_threshold = float(os.getenv("RECOGNITION_THRESHOLD", 0.4))
-            self.frame_skip = int(os.getenv("FRAME_SKIP", 5))
+            self.initial_frame_skip = int(os.getenv("FRAME_SKIP", 5))
+            self.frame_skip = self.initial_frame_skip
+            # Stride of frames streamed to the dashboard; frames that are neither analysed nor shown are never decoded.
+            # Every frame is streamed by default; raise it to trade stream smoothness for decode time
+            self.display_skip = int(os.getenv("DISPLAY_FRAME_SKIP", 1))
+            # Derive the stride from measured stage latency instead of keeping FRAME_SKIP fixed
+            self.adaptive_frame_skip = os.getenv("ADAPTIVE_FRAME_SKIP", "false").lower() == "true"
+            self.latency_budget = float(os.getenv("ADAPTIVE_LATENCY_BUDGET_MS", 500)) / 1000
+            self.max_frame_skip = int(os.getenv("ADAPTIVE_MAX_FRAME_SKIP", 15))
+            self.frame_scheduler = None
+            self.next_analysis_index = 0
+            # Skip detection on static frames once everyone in view is identified
+            self.motion_gate = None
+            if os.getenv("MOTION_GATING", "false").lower() == "true":
+                self.motion_gate = MotionGate(
+                    method=os.getenv("MOTION_GATE_METHOD", "diff"),
+                    min_changed_fraction=float(os.getenv("MOTION_GATE_THRESHOLD", 0.002)),
+                )
+            # Detection still runs after this many gated frames in a row, to catch anything the gate missed
+            self.motion_gate_max_skips = int(os.getenv("MOTION_GATE_MAX_SKIPS", 10))
+            self.consecutive_skipped_detections = 0
+            self.detections_run = 0
+            self.detections_skipped = 0
+            self.online_targets = []
+            self.capture_buffer_size = int(os.getenv("CAPTURE_BUFFER_SIZE", 2))
+            # Analysed frames whose faces are detected together in one detect_batch call. Above 1 this
+            # raises detector throughput (mainly on GPU, e.g. for recorded lectures) at the cost of holding
+            # back that many strides of stream frames until the batch is full
+            self.detection_batch_frames = max(1, int(os.getenv("DETECTION_BATCH_FRAMES", 1)))
+            self.last_analysis_index = -1
+            # Detect and track on a frame shrunk to this width; recognition crops still come from the full frame
+            self.detection_width = int(os.getenv("DETECTION_WIDTH", 0))
+            # New tracks collect crops over BEST_SHOT_FRAMES analysed frames and are recognised from the best BEST_SHOT_K
+            self.best_shot_k = int(os.getenv("BEST_SHOT_K", 3))
+            self.best_shot_frames = int(os.getenv("BEST_SHOT_FRAMES", 3))
+            # A student is confirmed after CONFIRMATION_HITS matches within CONFIRMATION_WINDOW_SECONDS;
+            # a track runs at most MAX_EMBEDDINGS_PER_TRACK crops through the recognition model. Each attempt
+            # embeds up to BEST_SHOT_K crops, so the default allows five attempts at the default K of 3
+            self.confirmation_hits = int(os.getenv("CONFIRMATION_HITS", 3))
+            self.confirmation_window = float(os.getenv("CONFIRMATION_WINDOW_SECONDS", 10))
+            self.max_embeddings_per_track = int(os.getenv("MAX_EMBEDDINGS_PER_TRACK", 15))
+            # When several new faces appear in one frame, solve them jointly so no two claim the same student
+            self.one_to_one_matching = os.getenv("ONE_TO_ONE_MATCHING", "false").lower() == "true"
             self.current_lecture = current_lecture if current_lecture else {}
             
-            logger.info("Using RetinaFace for detection and ArcFace for recognition.")
+            self.detector_name = os.getenv("FACE_DETECTOR", "retinaface")
+            logger.info(f"Using {self.detector_name} for detection and {self.recognition_model} for recognition.")
+            # AdaFace embeds a whole list of crops in one forward pass; DeepFace models go crop by crop.
+            # Either loads on the first pipeline, then stays shared across pipelines
+            self.adaface = model_registry.get("adaface") if self.recognition_model == "AdaFace" else None
+            self.deepface = model_registry.get("deepface") if self.adaface is None else None
+            self.detector = create_face_detector(self.detector_name)
+            # Tiling (DETECTION_TILES as rows x cols) helps with small faces at the back of large halls
+            tile_rows, tile_cols = map(int, os.getenv("DETECTION_TILES", "1x1").lower().split("x"))
+            roi_mask = load_roi_mask(self.current_lecture.get("hall"))
+            if tile_rows * tile_cols > 1 or roi_mask is not None:
+                self.detector = TiledFaceDetector(
+                    self.detector, rows=tile_rows, cols=tile_cols,
+                    overlap=float(os.getenv("DETECTION_TILE_OVERLAP", 0.2)),
+                    iou_threshold=float(os.getenv("DETECTION_NMS_IOU", 0.5)),
+                    roi_mask=roi_mask,
+                )
+                logger.info(f"Tiled detection: {tile_rows}x{tile_cols} tiles, ROI mask {'on' if roi_mask is not None else 'off'}")
             logger.info("Loading student database...")
             
-            # Load student database - revert to original approach for accuracy
-            logger.info("Loading all student database for face recognition...")
-            self.student_db = database_handler.get_all_student_data()
+            # Read the change counter before the roster so edits made while loading are replayed
+            self.gallery_poll_seconds = float(os.getenv("GALLERY_POLL_SECONDS", 5))
+            self.gallery_version = database_handler.get_student_change_version()
+            self.last_gallery_poll = time.monotonic()
+            
+            # Open the shared memory-mapped embedding store instead of deserialising every BLOB row
+            logger.info("Opening embedding store for face recognition...")
+            snapshot = database_handler.load_embedding_store()
+            self._check_embedding_space(snapshot)
+            self.student_db = snapshot.students
             logger.info(f"Loaded {len(self.student_db)} total students for face recognition")
             
-            # Validate student database for debugging
-            valid_students = 0
-            for roll_no, data in self.student_db.items():
-                if "arcface_embedding" in data and data["arcface_embedding"] is not None:
-                    valid_students += 1
-                else:
-                    logger.warning(f"Student {roll_no} has missing or invalid embedding")
-            logger.info(f"Valid embeddings: {valid_students}/{len(self.student_db)}")
+            # Wrap the store's normalised matrix directly so each match is a single mat-vec
+            self.gallery = EmbeddingGallery.from_arrays(
+                snapshot.roll_nos, snapshot.matrix, self.student_db,
+                index=os.getenv("GALLERY_INDEX", "exact"),
+                index_path=database_handler.GALLERY_INDEX_FILE,
+                n_probe=int(os.getenv("IVF_NPROBE", 8)),
+                rerank=int(os.getenv("GALLERY_RERANK", 32)),
+                store=database_handler.get_embedding_store(),
+            )
+            logger.info(f"Valid embeddings: {len(self.gallery)}/{len(self.student_db)}")
             
             # If class info is available, log it for filtering attendance records later
             if current_lecture and current_lecture.get('class'):
                 lecture_class = current_lecture.get('class')
                 logger.info(f"Attendance will be recorded for class: {lecture_class}")
                 self.target_class = lecture_class
+                self.target_department = current_lecture.get('department')
+                # Search the lecture's own class first; the full gallery is only a fallback
+                self.lecture_gallery = self.gallery.shard(lecture_class, self.target_department)
+                logger.info(f"Lecture shard holds {len(self.lecture_gallery)}/{len(self.gallery)} embeddings")
             else:
                 logger.warning("No class information provided in lecture")
                 self.target_class = None
+                self.target_department = None
+                self.lecture_gallery = None
             
             self.tracker = BYTETracker(frame_rate=30)
             self.stop_event = stop_event
             self.confirmed_attendance = {}
             self.tracks = {}
+            # The tracker's removed-track list is trimmed to this many entries after every update
+            self.max_removed_tracks = int(os.getenv("MAX_REMOVED_TRACKS", 100))
+            self.removed_tracks_seen = 0
+            self.tracks_evicted = 0
             self.is_initialized = True
             logger.info("Verification pipeline initialized successfully.")
         except Exception as e:
             logger.error(f"FATAL: Failed to initialize VerificationPipeline: {e}", exc_info=True)
             self.is_initialized = False
 
+    def _check_embedding_space(self, snapshot):
+        """
+        Refuses to start when live queries would land in a different embedding space
+        than the stored roster: distances across two models are meaningless, and every
+        "match" would silently credit the wrong student.
+        """
+        if snapshot.model != self.recognition_model:
+            raise ValueError(f"Stored embeddings come from {snapshot.model} but RECOGNITION_MODEL is "
+                             f"{self.recognition_model}; re-register students or switch the model")
+        if not len(snapshot.roll_nos):
+            return
+        probe = self._get_embeddings_from_crops([np.zeros((112, 112, 3), dtype=np.uint8)])[0]
+        if probe is None or len(probe) != snapshot.matrix.shape[1]:
+            raise ValueError(f"{self.recognition_model} produces {len(probe) if probe is not None else 'no'}-d embeddings "
+                             f"but the store holds {snapshot.matrix.shape[1]}-d ones")
+
+    def _refresh_gallery(self):
+        """
+        Polls the student change counter and applies only the added, updated or deleted
+        students to the in-memory gallery, so new registrations show up without a restart.
+        """
+        now = time.monotonic()
+        if now - self.last_gallery_poll < self.gallery_poll_seconds:
+            return
+        self.last_gallery_poll = now
+        try:
+            version, changed_roll_nos = database_handler.get_student_changes(self.gallery_version)
+            if version == self.gallery_version:
+                return
+            if changed_roll_nos is None:
+                # The students table was recreated, so diff against the whole roster
+                current = database_handler.get_all_student_data()
+                changed_roll_nos = set(self.student_db) | set(current)
+            else:
+                current = database_handler.get_student_data(changed_roll_nos)
+            
+            upserts, removals = {}, []
+            for roll_no in changed_roll_nos:
+                data = current.get(roll_no)
+                if data is None or data["adaface_embedding"] is None:
+                    removals.append(roll_no)
+                    self.student_db.pop(roll_no, None)
+                else:
+                    upserts[roll_no] = (data["adaface_embedding"], data["student_class"], data["department"])
+                    self.student_db[roll_no] = {"name": data["name"], "student_class": data["student_class"],
+                                                "department": data["department"]}
+            # One pass over the whole change set, so a store-backed gallery re-maps the store once
+            self.gallery.apply_changes(upserts, removals)
+            
+            if self.target_class:
+                self.lecture_gallery = self.gallery.shard(self.target_class, self.target_department)
+            # Faces nobody recognised get another chance against the updated roster
+            budget = min(self.best_shot_k, self.max_embeddings_per_track)
+            for state in self.tracks.values():
+                if state.roll_no is None:
+                    state.restart_matching(budget)
+            self.gallery_version = version
+            logger.info(f"Applied {len(changed_roll_nos)} roster change(s); gallery now holds {len(self.gallery)} embeddings")
+        except Exception as e:
+            logger.warning(f"Live gallery refresh failed, will retry: {e}")
+
     def _get_embedding_from_crop(self, face_crop):
         try:
-            embedding_objs = DeepFace.represent(
+            embedding_objs = self.deepface.represent(
                 img_path=face_crop, model_name=self.recognition_model, 
                 enforce_detection=False, detector_backend='skip'
             )
@@ -73,107 +219,351 @@ class VerificationPipeline:
         except Exception:
             return None
 
-    def _match_embedding_to_db(self, embedding):
-        min_dist, matched_roll_no = float('inf'), "Unknown"
-        second_min_dist = float('inf')
-        
-        for roll_no, data in self.student_db.items():
-            dist = cosine(embedding, data["arcface_embedding"])
-            if dist < min_dist:
-                second_min_dist = min_dist
-                min_dist, matched_roll_no = dist, roll_no
-            elif dist < second_min_dist:
-                second_min_dist = dist
-        
-        # Log matching details for debugging
-        if min_dist < self.recognition_threshold:
-            confidence_gap = second_min_dist - min_dist
-            student_name = self.student_db.get(matched_roll_no, {}).get("name", "Unknown")
-            logger.info(f"Face matched: {student_name} ({matched_roll_no}) - Distance: {min_dist:.3f}, Confidence Gap: {confidence_gap:.3f}")
-            return matched_roll_no
+    def _get_embeddings_from_crops(self, face_crops):
+        if self.adaface is not None:
+            return self.adaface.get_embeddings(face_crops)
+        return [self._get_embedding_from_crop(crop) for crop in face_crops]
+
+    def _embed_best_shots(self, track_ids):
+        """One embedding per track: the normalised mean over its best crops, all embedded in a single batch."""
+        crops, owners = [], []
+        for track_id in track_ids:
+            for crop in self.tracks[track_id].best_shots.best():
+                crops.append(crop)
+                owners.append(track_id)
+        for track_id in owners:
+            self.tracks[track_id].crops_embedded += 1
+        per_track = {}
+        for track_id, embedding in zip(owners, self._get_embeddings_from_crops(crops) if crops else []):
+            if embedding is not None:
+                per_track.setdefault(track_id, []).append(embedding)
+        return {track_id: l2_normalize(l2_normalize(embeddings).mean(axis=0)) for track_id, embeddings in per_track.items()}
+
+    def _search_gallery(self, gallery, embeddings, taken=()):
+        """
+        Returns the nearest roll_no (None if none), its distance and the confidence gap per embedding.
+        With one-to-one matching, roll_nos in `taken` are already claimed by other faces of the frame.
+        """
+        if self.one_to_one_matching:
+            roll_nos, distances = gallery.assign(embeddings, self.recognition_threshold, exclude=taken)
+            return list(roll_nos), list(distances), [None] * len(roll_nos)
+        top_roll_nos, top_distances = gallery.search(embeddings, k=2)
+        return list(top_roll_nos[:, 0]), list(top_distances[:, 0]), list(top_distances[:, 1] - top_distances[:, 0])
+
+    def _match_embeddings_to_db(self, embeddings):
+        """Matches every new track of a frame in one GEMM. Returns one roll_no (or "Unknown") per embedding."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.lecture_gallery is None:
+            roll_nos, distances, gaps = self._search_gallery(self.gallery, embeddings)
         else:
-            logger.debug(f"No match found - Minimum distance: {min_dist:.3f} (threshold: {self.recognition_threshold})")
-            return "Unknown"
+            roll_nos, distances, gaps = self._search_gallery(self.lecture_gallery, embeddings)
+            # Only faces with no in-class match clearing the threshold are searched institution-wide
+            fallback = [i for i, (roll_no, dist) in enumerate(zip(roll_nos, distances))
+                        if roll_no is None or not dist < self.recognition_threshold]
+            if fallback:
+                # Students the shard already matched stay out of the institution-wide assignment
+                taken = {roll_nos[i] for i in set(range(len(roll_nos))) - set(fallback)}
+                fallback_results = self._search_gallery(self.gallery, embeddings[fallback], taken)
+                for i, roll_no, dist, gap in zip(fallback, *fallback_results):
+                    roll_nos[i], distances[i], gaps[i] = roll_no, dist, gap
+
+        results = []
+        for matched_roll_no, min_dist, confidence_gap in zip(roll_nos, distances, gaps):
+            # Log matching details for debugging
+            if matched_roll_no is not None and min_dist < self.recognition_threshold:
+                student_name = self.student_db.get(matched_roll_no, {}).get("name", "Unknown")
+                gap_text = f", Confidence Gap: {confidence_gap:.3f}" if confidence_gap is not None else ""
+                logger.info(f"Face matched: {student_name} ({matched_roll_no}) - Distance: {min_dist:.3f}{gap_text}")
+                results.append(matched_roll_no)
+            else:
+                logger.debug(f"No match found - Minimum distance: {min_dist:.3f} (threshold: {self.recognition_threshold})")
+                results.append("Unknown")
+        return results
+
+    def _recognise_tracks(self, track_ids):
+        """
+        One recognition attempt for each track whose best-shot buffer is ready: fold the new
+        embedding into the track's running mean, match all means in one batch and count hits.
+        """
+        track_embeddings = self._embed_best_shots(track_ids)
+        attempted = []
+        for track_id in track_ids:
+            state = self.tracks[track_id]
+            # The buffer is spent; a fresh one is opened below only if another attempt is due.
+            # A track none of whose crops produced an embedding is given up on, as before.
+            state.best_shots = None
+            if track_id in track_embeddings:
+                state.add_embedding(track_embeddings[track_id])
+                attempted.append(track_id)
+        if not attempted:
+            return 0
+
+        now = time.monotonic()
+        means = l2_normalize([self.tracks[track_id].mean_embedding() for track_id in attempted])
+        for track_id, roll_no in zip(attempted, self._match_embeddings_to_db(means)):
+            state = self.tracks[track_id]
+            matched = roll_no if roll_no != "Unknown" else None
+            if state.record_match(matched, now, self.confirmation_hits, self.confirmation_window):
+                self._identify_track(state, roll_no)
+            elif state.crops_embedded < self.max_embeddings_per_track:
+                # The last attempt keeps only as many crops as the cap has left
+                state.best_shots = BestShotBuffer(min(self.best_shot_k, self.max_embeddings_per_track - state.crops_embedded))
+        return len(attempted)
+
+    def _identify_track(self, state, roll_no):
+        """Confirms the identity of a track and records attendance the first time a student is seen."""
+        student_info = self.student_db.get(roll_no, {})
+        student_name = student_info.get("name", "Unknown")
+        state.roll_no = roll_no
+        
+        if roll_no not in self.confirmed_attendance:
+            # Check if student belongs to the target class (if specified)
+            should_record = True
+            if self.target_class:
+                student_class = student_info.get("student_class")
+                if student_class != self.target_class:
+                    logger.info(f"Student {student_name} ({roll_no}) detected but belongs to {student_class}, not {self.target_class}. Skipping attendance.")
+                    should_record = False
+            
+            if should_record:
+                self.confirmed_attendance[roll_no] = {"name": student_name, "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')}
+                database_handler.record_attendance(roll_no, student_name, self.current_lecture)
+                logger.info(f"Recorded attendance for {student_name} ({roll_no}) in class {self.target_class or 'Any'}")
+
+    def _count_unidentified(self, online_targets):
+        """Tracks in view that are still being recognised; confirmed and given-up tracks do not count."""
+        return sum(1 for t in online_targets
+                   if int(t[4]) not in self.tracks or self.tracks[int(t[4])].needs_recognition)
+
+    def _on_track_removed(self, track_id):
+        """Lifecycle hook: the tracker gave up on this track, so its identity state and crops go too."""
+        if self.tracks.pop(track_id, None) is not None:
+            self.tracks_evicted += 1
+
+    def _collect_removed_tracks(self):
+        """
+        Runs the removal hook for every track removed by the last tracker update, then
+        trims the tracker's removed list, which otherwise grows for the whole session.
+        """
+        removed = self.tracker.removed_stracks
+        for strack in removed[self.removed_tracks_seen:]:
+            self._on_track_removed(strack.track_id)
+        if len(removed) > self.max_removed_tracks:
+            # Only the most recent removals are consulted by the tracker's next update
+            del removed[:-self.max_removed_tracks]
+        self.removed_tracks_seen = len(removed)
+
+    def _coast_tracks(self):
+        """Advances confirmed tracks with the tracker's Kalman motion model alone, for frames whose detection was skipped."""
+        tracks = [t for t in self.tracker.tracked_stracks if t.is_activated]
+        if not tracks:
+            return []
+        type(tracks[0]).multi_predict(tracks)
+        return [(*t.tlbr, t.track_id, 0, t.score) for t in tracks]
+
+    def _detection_frame(self, frame):
+        """The frame the detector and tracker work on, and its scale relative to the full frame."""
+        width = frame.shape[1]
+        if not self.detection_width or width <= self.detection_width:
+            return frame, 1.0
+        scale = self.detection_width / width
+        return cv2.resize(frame, (self.detection_width, round(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA), scale
+
+    def _track_boxes(self, online_targets, scale, frame_shape):
+        """
+        Tracker output as an int (N, 5) array of [x1, y1, x2, y2, track_id] in full-resolution
+        pixels, plus each track's detection confidence.
+        """
+        if not len(online_targets):
+            return np.empty((0, 5), dtype=int), np.empty(0)
+        # Rows are [x1, y1, x2, y2, track_id, class, score]
+        targets = np.asarray(online_targets, dtype=np.float64)
+        height, width = frame_shape[:2]
+        # One vectorised rescale and clip; Kalman-predicted boxes can run past the frame edge
+        boxes = np.clip(targets[:, :4] / scale, 0, [width, height, width, height])
+        scores = targets[:, 6] if targets.shape[1] > 6 else np.ones(len(targets))
+        return np.hstack([boxes, targets[:, 4:5]]).astype(int), scores
+
+    def _should_decode(self, frame_index):
+        # Called from the capture thread, which runs ahead of run(). next_analysis_index can move back
+        # (a shrinking adaptive stride reschedules, each run resets it), so frames skipped under the old
+        # value stay skipped and run() analyses the next decoded frame at or past the new one
+        return frame_index >= self.next_analysis_index or frame_index % self.display_skip == 0
+
+    def _reset_run_state(self):
+        """Frame positions restart with every run, so the scheduling state of a previous run must not carry over."""
+        self.frame_skip = self.initial_frame_skip
+        self.next_analysis_index = 0
+        self.last_analysis_index = -1
+        self.consecutive_skipped_detections = 0
+        self.online_targets = []
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
 
     def run(self):
         if not self.is_initialized: return
+        self._reset_run_state()
         
         source_to_open = int(self.video_source) if self.video_source.isdigit() else self.video_source
-        video_capture = cv2.VideoCapture(source_to_open)
+        # Frames are read on their own thread so slow detection never stalls the camera
+        video_capture = ThreadedCapture(source_to_open, buffer_size=self.capture_buffer_size,
+                                        should_decode=self._should_decode)
+        self.video_capture = video_capture
         if not video_capture.isOpened():
             logger.error(f"FATAL: Cannot open video source: '{self.video_source}'.")
+            video_capture.release()
             return
+        if self.adaptive_frame_skip:
+            self.frame_scheduler = AdaptiveFrameSkip(
+                fps=video_capture.capture.get(cv2.CAP_PROP_FPS),
+                latency_budget=self.latency_budget, max_skip=self.max_frame_skip,
+            )
 
-        frame_count = 0
-        while not self.stop_event.is_set():
-            ret, frame = video_capture.read()
-            if not ret: break
+        try:
+            # Frames read since the last detection batch, in stream order: (frame, analysis or None)
+            pending = []
+            while not self.stop_event.is_set():
+                ret, frame = video_capture.read()
+                if not ret: break
+                if frame is None: continue  # No new frame yet; re-check the stop event
             
-            frame_count += 1
-            if frame_count % self.frame_skip != 0:
-                yield frame
-                continue
+                # Compare source positions rather than counting reads, so frames dropped on a live source still count
+                frame_count = video_capture.frame_index
+                if frame_count < self.next_analysis_index:
+                    # Raw frames wait behind any analysed frame still waiting for its detections
+                    if pending:
+                        pending.append((frame, None))
+                    else:
+                        yield frame
+                    continue
+                self.next_analysis_index = frame_count + self.frame_skip
+                self.last_analysis_index = frame_count
+                pending.append((frame, self._begin_analysis(frame, frame_count)))
+                if sum(1 for _, analysis in pending if analysis is not None) >= self.detection_batch_frames:
+                    yield from self._process_pending(pending)
+                    pending = []
+            # Frames still waiting when the stream ends are analysed with a smaller batch
+            if pending and not self.stop_event.is_set():
+                yield from self._process_pending(pending)
+        finally:
+            # Runs even when the consumer closes the generator mid-stream
+            video_capture.release()
+            logger.info(f"Face detection ran on {self.detections_run} frames, skipped on {self.detections_skipped} static frames")
 
-            annotated_frame = frame.copy()
-            online_targets = []
-            
+    def _begin_analysis(self, frame, frame_count):
+        """
+        What is decided as soon as an analysed frame is read: gallery refresh, the detection
+        frame and whether motion gating lets detection be skipped.
+        """
+        self._refresh_gallery()
+        detection_frame, scale = self._detection_frame(frame)
+        # The gate sees every analysed frame so its reference stays current
+        static = self.motion_gate is not None and self.motion_gate.is_static(detection_frame)
+        skip_detection = (static and self._count_unidentified(self.online_targets) == 0
+                          and self.consecutive_skipped_detections < self.motion_gate_max_skips)
+        if skip_detection:
+            self.detections_skipped += 1
+            self.consecutive_skipped_detections += 1
+        else:
+            self.detections_run += 1
+            self.consecutive_skipped_detections = 0
+        return {"frame_count": frame_count, "detection_frame": detection_frame, "scale": scale,
+                "skip_detection": skip_detection, "detections": None}
+
+    def _process_pending(self, pending):
+        """
+        Detects faces on every waiting analysed frame in one detect_batch call, then tracks,
+        recognises and annotates them in stream order. Yields every waiting frame.
+        """
+        to_detect = [analysis for _, analysis in pending if analysis is not None and not analysis["skip_detection"]]
+        detection_seconds = 0.0
+        if to_detect:
+            detection_start = time.perf_counter()
             try:
-                detected_faces = DeepFace.extract_faces(
-                    img_path=frame, detector_backend='retinaface', enforce_detection=False
-                )
-                
-                detections_for_tracker = []
-                for face_obj in detected_faces:
-                    fa = face_obj['facial_area']
-                    x, y, w, h = fa['x'], fa['y'], fa['w'], fa['h']
-                    confidence = face_obj['confidence']
-                    # --- THIS IS THE CRITICAL FIX ---
-                    # Add a dummy class ID of 0 for BYTETracker compatibility
-                    detections_for_tracker.append([x, y, x + w, y + h, confidence, 0])
-
-                if detections_for_tracker:
-                    online_targets = self.tracker.update(torch.tensor(detections_for_tracker), [frame.shape[0], frame.shape[1]])
+                # Already [x1, y1, x2, y2, conf, 0] rows, the layout BYTETracker expects
+                for analysis, detections in zip(to_detect, self.detector.detect_batch([a["detection_frame"] for a in to_detect])):
+                    analysis["detections"] = detections
             except Exception as e:
-                logger.warning(f"Face detection/tracking failed for frame {frame_count}: {e}")
-
-            for t in online_targets:
-                x1, y1, x2, y2, track_id = map(int, t[:5])
-                
-                if track_id not in self.tracks:
-                    face_crop = frame[y1:y2, x1:x2]
-                    embedding = self._get_embedding_from_crop(face_crop)
-                    
-                    if embedding is not None:
-                        roll_no = self._match_embedding_to_db(embedding)
-                        student_info = self.student_db.get(roll_no, {})
-                        student_name = student_info.get("name", "Unknown")
-                        self.tracks[track_id] = {"name": student_name, "roll_no": roll_no}
-                        
-                        if roll_no != "Unknown" and roll_no not in self.confirmed_attendance:
-                            # Check if student belongs to the target class (if specified)
-                            should_record = True
-                            if self.target_class:
-                                student_class = database_handler.get_student_class(roll_no)
-                                if student_class != self.target_class:
-                                    logger.info(f"Student {student_name} ({roll_no}) detected but belongs to {student_class}, not {self.target_class}. Skipping attendance.")
-                                    should_record = False
-                            
-                            if should_record:
-                                self.confirmed_attendance[roll_no] = {"name": student_name, "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')}
-                                database_handler.record_attendance(roll_no, student_name, self.current_lecture)
-                                logger.info(f"Recorded attendance for {student_name} ({roll_no}) in class {self.target_class or 'Any'}")
-                    else:
-                        self.tracks[track_id] = {"name": "Unknown", "roll_no": "Unknown"}
-                
-                track_info = self.tracks.get(track_id)
-                if track_info:
-                    color = (0, 255, 0) if track_info["roll_no"] != "Unknown" else (0, 0, 255)
-                    cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(annotated_frame, track_info["name"], (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-            
-            yield annotated_frame
+                logger.warning(f"Face detection failed for frames {[a['frame_count'] for a in to_detect]}: {e}")
+            # The batch's cost is shared evenly by its frames for the stride controller
+            detection_seconds = (time.perf_counter() - detection_start) / len(to_detect)
+
+        for frame, analysis in pending:
+            yield frame if analysis is None else self._finish_analysis(frame, analysis, detection_seconds)
+
+    def _finish_analysis(self, frame, analysis, detection_seconds):
+        """Steps the tracker with one analysed frame's detections, recognises ready tracks and annotates the frame."""
+        frame_count, detection_frame, scale = analysis["frame_count"], analysis["detection_frame"], analysis["scale"]
+        skip_detection = analysis["skip_detection"]
+        online_targets = []
+        tracking_start = time.perf_counter()
+        if skip_detection:
+            online_targets = self._coast_tracks()
+        elif analysis["detections"] is not None:
+            try:
+                # Stepped even with no detections, so lost tracks age out and are removed
+                online_targets = self.tracker.update(torch.from_numpy(analysis["detections"]), list(detection_frame.shape[:2]))
+                self._collect_removed_tracks()
+            except Exception as e:
+                logger.warning(f"Face tracking failed for frame {frame_count}: {e}")
+        detection_seconds += time.perf_counter() - tracking_start
+        self.online_targets = online_targets
+        track_boxes, track_scores = self._track_boxes(online_targets, scale, frame.shape)
 
-        video_capture.release()
+        # New tracks keep their best crops; once a track has been seen long enough its
+        # best crops from every ready track are embedded together and matched in one batch
+        embedding_start = time.perf_counter()
+        ready_track_ids = []
+        for (x1, y1, x2, y2, track_id), confidence in zip(track_boxes.tolist(), track_scores):
+            state = self.tracks.get(track_id)
+            if state is None:
+                state = self.tracks[track_id] = TrackState(min(self.best_shot_k, self.max_embeddings_per_track))
+            if not state.needs_recognition:
+                continue
+            state.best_shots.offer(frame[y1:y2, x1:x2], confidence)
+            if state.best_shots.seen >= self.best_shot_frames and track_id not in ready_track_ids:
+                ready_track_ids.append(track_id)
+
+        recognised = self._recognise_tracks(ready_track_ids) if ready_track_ids else 0
+        embedding_seconds = time.perf_counter() - embedding_start
+
+        if self.frame_scheduler is not None:
+            if not skip_detection:
+                self.frame_scheduler.record(detection_seconds, embedding_seconds, recognised)
+            unidentified = self._count_unidentified(online_targets)
+            self.frame_skip = self.frame_scheduler.next_stride(len(online_targets), unidentified)
+            # Frames batched after this one were already scheduled with the previous stride
+            if frame_count == self.last_analysis_index:
+                self.next_analysis_index = frame_count + self.frame_skip
+
+        annotated_frame = frame.copy()
+        for x1, y1, x2, y2, track_id in track_boxes.tolist():
+            state = self.tracks.get(track_id)
+            if state is None:
+                continue
+            if state.roll_no is not None:
+                color, label = (0, 255, 0), self.student_db.get(state.roll_no, {}).get("name", "Unknown")
+            elif state.needs_recognition:
+                # Still collecting crops or waiting for enough consistent matches
+                color = (0, 255, 255)
+                label = f"{self.student_db[state.candidate]['name']}?" if state.candidate in self.student_db else ""
+            else:
+                color, label = (0, 0, 255), "Unknown"
+            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
+            if label:
+                cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        return annotated_frame
 
     def get_attendance(self):
-        return self.confirmed_attendance
\ No newline at end of file
+        return self.confirmed_attendance
+
+    def get_stats(self):
+        capture = getattr(self, "video_capture", None)
+        return {
+            "frame_skip": self.frame_skip,
+            "frames_dropped": capture.dropped_frames if capture else 0,
+            "detections_run": self.detections_run,
+            "detections_skipped": self.detections_skipped,
+            "active_tracks": len(self.tracks),
+            "tracks_evicted": self.tracks_evicted,
+        }
\ No newline at end of file
@@ -0,0 +1,196 @@
+# backend/pipeline_manager.py (Concurrent verification pipelines, one per hall or camera)
+import logging
+import threading
+import time
+
+from backend.pipeline import VerificationPipeline
+from backend.pipeline_worker import RemotePipeline
+from backend.stream_hub import MJPEGBroadcaster
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("reject", "queue")
+# "thread" runs every pipeline in the API process; "process" gives each its own worker process
+EXECUTION_MODES = {"thread": VerificationPipeline, "process": RemotePipeline}
+
+
+class PipelineCapacityError(RuntimeError):
+    """Raised when the concurrency cap is reached and the overflow policy is 'reject'."""
+
+
+class PipelineSession:
+    """One pipeline's thread, stop event and stream broadcaster, keyed by hall or camera ID."""
+
+    def __init__(self, pipeline_id, current_lecture=None, video_source=None):
+        self.pipeline_id = pipeline_id
+        self.current_lecture = current_lecture
+        self.video_source = video_source
+        self.stop_event = threading.Event()
+        self.broadcaster = MJPEGBroadcaster()
+        self.pipeline = None
+        self.thread = None
+        self.state = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+
+    def publish(self, frame):
+        """Encodes the frame once for all stream clients, or not at all when nobody is watching."""
+        self.broadcaster.publish(frame)
+
+    def status(self):
+        status = {
+            "pipeline_id": self.pipeline_id,
+            "state": self.state,
+            "current_lecture": self.current_lecture,
+            "video_source": self.pipeline.video_source if self.pipeline else self.video_source,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "error": self.error,
+            "stream": self.broadcaster.stats(),
+        }
+        if self.pipeline is not None:
+            status["attendance_count"] = len(self.pipeline.get_attendance())
+            status["stats"] = self.pipeline.get_stats()
+        return status
+
+
+class PipelineManager:
+    """
+    Runs several VerificationPipelines side by side, e.g. one per lecture hall.
+    In thread mode models are shared through model_registry, so each extra pipeline
+    only adds its tracker, gallery view and frame buffers. In process mode each
+    pipeline runs in a worker process with its own models, so pipelines no longer
+    compete for the API process's GIL.
+
+    At most `max_pipelines` run at once. Further sessions are either rejected with
+    PipelineCapacityError or queued until a running one stops (`overflow`).
+    """
+
+    def __init__(self, max_pipelines=2, overflow="reject", execution="thread"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown pipeline overflow policy '{overflow}', expected one of {OVERFLOW_POLICIES}")
+        if execution not in EXECUTION_MODES:
+            raise ValueError(f"Unknown pipeline execution mode '{execution}', expected one of {tuple(EXECUTION_MODES)}")
+        self.max_pipelines = max_pipelines
+        self.overflow = overflow
+        self.execution = execution
+        self.sessions = {}
+        self.running = 0
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+
+    def get(self, pipeline_id):
+        with self._lock:
+            return self.sessions.get(pipeline_id)
+
+    def start(self, pipeline_id, current_lecture=None, video_source=None):
+        """
+        Starts a pipeline, or queues it when every slot is taken. Raises ValueError if the
+        ID is already in use, PipelineCapacityError when rejected and RuntimeError if the
+        pipeline fails to initialise.
+        """
+        session = PipelineSession(pipeline_id, current_lecture, video_source)
+        with self._lock:
+            existing = self.sessions.get(pipeline_id)
+            if existing is not None and existing.state in ("queued", "running"):
+                raise ValueError(f"Pipeline '{pipeline_id}' is already {existing.state}.")
+            has_slot = self.running < self.max_pipelines
+            if not has_slot and self.overflow == "reject":
+                raise PipelineCapacityError(f"All {self.max_pipelines} pipeline slots are in use.")
+            if has_slot:
+                self.running += 1
+            self.sessions[pipeline_id] = session
+
+        if not has_slot:
+            logger.info(f"Pipeline '{pipeline_id}' queued; all {self.max_pipelines} slots are in use")
+            session.thread = threading.Thread(target=self._wait_and_run, args=(session,), daemon=True)
+            session.thread.start()
+            return session
+
+        # With a free slot, initialise in the caller so failures surface as errors straight away
+        if not self._initialize(session):
+            raise RuntimeError(session.error)
+        session.state = "running"
+        session.thread = threading.Thread(target=self._run, args=(session,), daemon=True)
+        session.thread.start()
+        return session
+
+    def _initialize(self, session):
+        pipeline_class = EXECUTION_MODES[self.execution]
+        try:
+            session.pipeline = pipeline_class(session.stop_event, session.current_lecture, video_source=session.video_source)
+        except Exception as e:
+            # e.g. shared memory or the worker process could not be created; the slot must still be freed
+            logger.error(f"Pipeline '{session.pipeline_id}' failed to start: {e}", exc_info=True)
+            session.pipeline = None
+            error = str(e) or type(e).__name__
+        else:
+            if session.pipeline.is_initialized:
+                return True
+            error = (getattr(session.pipeline, "error", None)
+                     or "Failed to initialize verification pipeline. Check backend logs for model/video path errors.")
+        session.state = "failed"
+        session.error = error
+        session.broadcaster.close()
+        self._release_slot()
+        return False
+
+    def _wait_and_run(self, session):
+        with self._lock:
+            while self.running >= self.max_pipelines and not session.stop_event.is_set():
+                self._slot_freed.wait(timeout=1.0)
+            if session.stop_event.is_set():
+                return
+            self.running += 1
+        logger.info(f"Pipeline '{session.pipeline_id}' leaving the queue")
+        if self._initialize(session):
+            self._run(session)
+
+    def _run(self, session):
+        session.state = "running"
+        session.started_at = time.time()
+        try:
+            for frame in session.pipeline.run():
+                if session.stop_event.is_set():
+                    break
+                session.publish(frame)
+            session.state = "stopped"
+        except Exception as e:
+            logger.error(f"Pipeline '{session.pipeline_id}' crashed: {e}", exc_info=True)
+            session.state = "failed"
+            session.error = str(e)
+        finally:
+            session.broadcaster.close()
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._lock:
+            self.running -= 1
+            self._slot_freed.notify_all()
+
+    def stop(self, pipeline_id, timeout=5):
+        """Stops and forgets the pipeline. Returns its final attendance, or None if it was unknown."""
+        with self._lock:
+            session = self.sessions.pop(pipeline_id, None)
+        if session is None:
+            return None
+        logger.info(f"Stopping pipeline '{pipeline_id}'...")
+        session.stop_event.set()
+        if session.thread is not None:
+            session.thread.join(timeout=timeout)
+        session.broadcaster.close()
+        return session.pipeline.get_attendance() if session.pipeline else {}
+
+    def status(self, pipeline_id=None):
+        with self._lock:
+            sessions = list(self.sessions.values())
+        if pipeline_id is not None:
+            return next((s.status() for s in sessions if s.pipeline_id == pipeline_id), None)
+        return {
+            "max_pipelines": self.max_pipelines,
+            "running": self.running,
+            "overflow": self.overflow,
+            "execution": self.execution,
+            "pipelines": [s.status() for s in sessions],
+        }
@@ -0,0 +1,174 @@
+# backend/pipeline_worker.py (Runs a VerificationPipeline in its own process)
+import logging
+import multiprocessing
+import os
+import time
+
+from backend.frame_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+# spawn, not fork: the API process may already hold torch/TensorFlow threads and open sockets
+MP_CONTEXT = multiprocessing.get_context("spawn")
+STATS_INTERVAL_SECONDS = 1.0
+# Default for PIPELINE_STARTUP_TIMEOUT_SECONDS; loading models in a fresh worker can take minutes on CPU
+STARTUP_TIMEOUT_SECONDS = 600.0
+
+
+def run_worker(conn, stop_event, current_lecture, video_source, ring_name=None):
+    """
+    Worker process entry point. Builds its own pipeline (and models) and reports back
+    over `conn` with (kind, payload) messages:
+      ("ready", video_source) / ("failed", error) once, after initialisation
+      ("frame_seq", seq)            a yielded frame, written into the shared frame ring
+      ("frame", frame)              a yielded frame that does not fit a ring slot, pickled
+      ("attendance", (roll, info))  the first time a student's attendance is recorded
+      ("stats", dict)               pipeline.get_stats() about once a second
+      ("stopped", None) / ("failed", error) when the run ends
+    """
+    from backend.pipeline import VerificationPipeline
+
+    ring = SharedFrameRing.attach(ring_name) if ring_name else None
+    try:
+        pipeline = VerificationPipeline(stop_event, current_lecture, video_source=video_source)
+        if not pipeline.is_initialized:
+            conn.send(("failed", "Failed to initialize verification pipeline. Check backend logs for model/video path errors."))
+            return
+        conn.send(("ready", pipeline.video_source))
+
+        reported = set()
+        last_stats = 0.0
+        for frame in pipeline.run():
+            seq = ring.write(frame) if ring is not None else None
+            conn.send(("frame_seq", seq) if seq is not None else ("frame", frame))
+            for roll_no in pipeline.confirmed_attendance.keys() - reported:
+                conn.send(("attendance", (roll_no, pipeline.confirmed_attendance[roll_no])))
+                reported.add(roll_no)
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL_SECONDS:
+                conn.send(("stats", pipeline.get_stats()))
+                last_stats = now
+        conn.send(("stats", pipeline.get_stats()))
+        conn.send(("stopped", None))
+    except (BrokenPipeError, EOFError):
+        pass  # The parent went away; nothing left to report to
+    except Exception as e:
+        logger.error(f"Pipeline worker crashed: {e}", exc_info=True)
+        try:
+            conn.send(("failed", str(e)))
+        except (BrokenPipeError, EOFError):
+            pass
+    finally:
+        if ring is not None:
+            ring.close()
+        conn.close()
+
+
+class RemotePipeline:
+    """
+    Parent-side handle on a pipeline running in a worker process. It has the
+    VerificationPipeline interface the PipelineManager relies on: run() yields
+    frames, and get_attendance()/get_stats() return what the worker last reported.
+    """
+
+    def __init__(self, stop_event, current_lecture=None, video_source=None):
+        self.stop_event = stop_event
+        self.video_source = video_source
+        self.attendance = {}
+        self.stats = {}
+        self.error = None
+        self._worker_stop = MP_CONTEXT.Event()
+        # Frames come back through shared memory; the pipe only carries their sequence numbers
+        self.ring = SharedFrameRing.create(slots=int(os.getenv("FRAME_RING_SLOTS", 8)),
+                                           slot_bytes=int(os.getenv("FRAME_RING_SLOT_BYTES", 1920 * 1080 * 3)))
+        self.reader = self.ring.reader()
+        self.conn, child_conn = MP_CONTEXT.Pipe(duplex=False)
+        self.process = MP_CONTEXT.Process(
+            target=run_worker, args=(child_conn, self._worker_stop, current_lecture, video_source, self.ring.name),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()  # Only the worker writes; EOF on our end then means it exited
+        self.is_initialized = self._wait_until_ready()
+
+    def _wait_until_ready(self):
+        deadline = time.monotonic() + float(os.getenv("PIPELINE_STARTUP_TIMEOUT_SECONDS", STARTUP_TIMEOUT_SECONDS))
+        while time.monotonic() < deadline and not self.stop_event.is_set():
+            if not self.conn.poll(0.5):
+                if not self.process.is_alive():
+                    break
+                continue
+            try:
+                kind, payload = self.conn.recv()
+            except EOFError:
+                break
+            if kind == "ready":
+                self.video_source = payload
+                return True
+            self.error = payload
+            break
+        self._shutdown()
+        return False
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                if not self.conn.poll(0.5):
+                    if not self.process.is_alive():
+                        break
+                    continue
+                try:
+                    kind, payload = self.conn.recv()
+                except EOFError:
+                    break
+                if kind == "frame_seq":
+                    frame = self._read_ring()
+                    if frame is not None:
+                        yield frame
+                elif kind == "frame":
+                    yield payload
+                elif kind == "attendance":
+                    roll_no, info = payload
+                    self.attendance[roll_no] = info
+                elif kind == "stats":
+                    self.stats = payload
+                elif kind == "stopped":
+                    break
+                elif kind == "failed":
+                    raise RuntimeError(payload)
+        finally:
+            self._shutdown()
+
+    def _read_ring(self):
+        """
+        The newest frame in the ring as a private copy, or None. Older frames still queued on
+        the pipe are skipped. The worker may lap the slot while it is being copied, so the copy
+        is only kept if the slot still holds the same frame afterwards.
+        """
+        latest = self.reader.next()
+        if latest is None:
+            return None
+        seq, view = latest
+        frame = view.copy()
+        if not self.ring.is_current(seq):
+            self.reader.missed += 1
+            return None
+        return frame
+
+    def _shutdown(self, timeout=5):
+        self._worker_stop.set()
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            logger.warning(f"Pipeline worker {self.process.pid} did not stop in {timeout}s; terminating it")
+            self.process.terminate()
+            self.process.join(timeout=timeout)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def get_attendance(self):
+        return self.attendance
+
+    def get_stats(self):
+        return {**self.stats, "worker_pid": self.process.pid, "worker_alive": self.process.is_alive(),
+                "frames_missed": self.reader.missed}
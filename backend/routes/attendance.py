@@ -1,111 +1,126 @@
 # backend/routes/attendance.py (Final Hardened Version)
-import cv2
 import logging
+import os
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from threading import Thread, Event
 from pydantic import BaseModel
 from typing import Optional
-import queue # Use the correct import
-import time
 
-from ..pipeline import VerificationPipeline
+from ..pipeline_manager import PipelineCapacityError, PipelineManager
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-pipeline_thread = None
-pipeline_instance = None
-stop_event = None
-frame_queue = None
+# The original single-pipeline endpoints below drive this pipeline
+DEFAULT_PIPELINE_ID = "default"
+
+pipeline_manager = PipelineManager(
+    max_pipelines=int(os.getenv("MAX_CONCURRENT_PIPELINES", 2)),
+    overflow=os.getenv("PIPELINE_OVERFLOW", "reject"),
+    execution=os.getenv("PIPELINE_EXECUTION", "thread"),
+)
 
 class StartRequest(BaseModel):
     current_lecture: Optional[dict] = None
+    video_source: Optional[str] = None
+
 
-def run_pipeline_in_background():
-    """Target function that runs the pipeline and puts frames into a queue."""
-    global frame_queue
+def _start_pipeline(pipeline_id, request):
+    logger.info(f"Starting verification process for pipeline '{pipeline_id}'...")
     try:
-        if pipeline_instance and pipeline_instance.is_initialized:
-            for frame in pipeline_instance.run():
-                if stop_event and stop_event.is_set():
-                    break
-                if frame_queue.full():
-                    try:
-                        frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                frame_queue.put(frame)
-        else:
-            logger.error("Pipeline instance not initialized, thread cannot run.")
-    except Exception as e:
-        logger.error(f"Pipeline crashed: {e}", exc_info=True)
+        session = pipeline_manager.start(pipeline_id, request.current_lecture, request.video_source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PipelineCapacityError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if session.state == "queued":
+        return {"status": "Verification queued; it will start when a pipeline slot frees up.", "pipeline_id": pipeline_id}
+    return {"status": "Verification started successfully.", "pipeline_id": pipeline_id}
+
+
+def _stop_pipeline(pipeline_id):
+    attendance = pipeline_manager.stop(pipeline_id)
+    if attendance is None:
+        raise HTTPException(status_code=400, detail="Verification is not running.")
+    return {"status": "Verification stopped.", "pipeline_id": pipeline_id, "attendance_count": len(attendance)}
+
+
+async def stream_generator(pipeline_id=DEFAULT_PIPELINE_ID):
+    """Yields the pipeline's already-encoded JPEG chunks; every viewer shares the same encode."""
+    session = pipeline_manager.get(pipeline_id)
+    if not session:
+        logger.warning(f"Stream requested but pipeline '{pipeline_id}' is not running.")
+        return
+
+    logger.info(f"Stream generator attached to pipeline '{pipeline_id}'.")
+    async for chunk in session.broadcaster.stream():
+        yield chunk
+    logger.info("Stream generator has detached.")
+
 
+# --- Single-pipeline endpoints used by the dashboard ---
 
 @router.post("/start_verification")
-async def start_verification(request: StartRequest):
-    global pipeline_thread, pipeline_instance, stop_event, frame_queue
-    if pipeline_thread and pipeline_thread.is_alive():
-        raise HTTPException(status_code=400, detail="Verification is already running.")
-    
-    logger.info("Starting verification process...")
-    stop_event = Event()
-    frame_queue = queue.Queue(maxsize=2)
-    pipeline_instance = VerificationPipeline(stop_event, request.current_lecture)
-    
-    if not pipeline_instance.is_initialized:
-        raise HTTPException(status_code=500, detail="Failed to initialize verification pipeline. Check backend logs for model/video path errors.")
-
-    pipeline_thread = Thread(target=run_pipeline_in_background, daemon=True)
-    pipeline_thread.start()
-    
-    return {"status": "Verification started successfully."}
+def start_verification(request: StartRequest):
+    return _start_pipeline(DEFAULT_PIPELINE_ID, request)
 
 
 @router.post("/stop_verification")
-async def stop_verification():
-    global pipeline_thread, stop_event, pipeline_instance
-    if not stop_event:
-        raise HTTPException(status_code=400, detail="Verification is not running.")
-    
-    logger.info("Stopping verification process...")
-    stop_event.set()
-    if pipeline_thread:
-        pipeline_thread.join(timeout=5)
-    
-    pipeline_instance = None
-    return {"status": "Verification stopped."}
+def stop_verification():
+    return _stop_pipeline(DEFAULT_PIPELINE_ID)
 
 
 @router.get("/get_attendance")
 async def get_attendance():
-    if not pipeline_instance:
+    session = pipeline_manager.get(DEFAULT_PIPELINE_ID)
+    if not session or not session.pipeline:
         return {}
-    return pipeline_instance.get_attendance()
-
-
-def stream_generator():
-    """Yields frames from the shared queue."""
-    if not frame_queue:
-        logger.warning("Stream requested but frame queue is not available.")
-        return
-    
-    logger.info("Stream generator attached to frame queue.")
-    while not stop_event or not stop_event.is_set():
-        try:
-            frame = frame_queue.get(timeout=1.0)
-            (flag, encodedImage) = cv2.imencode(".jpg", frame)
-            if not flag: continue
-            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + 
-                   bytearray(encodedImage) + b'\r\n')
-        except queue.Empty:
-            if stop_event and stop_event.is_set():
-                break
-            continue
-    logger.info("Stream generator has detached.")
+    return session.pipeline.get_attendance()
 
 
 @router.get("/stream")
 async def video_stream():
     """Returns the streaming response."""
-    return StreamingResponse(stream_generator(), media_type="multipart/x-mixed-replace; boundary=frame")
\ No newline at end of file
+    return StreamingResponse(stream_generator(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+
+# --- Per-hall / per-camera pipelines ---
+
+@router.get("/pipelines")
+async def list_pipelines():
+    return pipeline_manager.status()
+
+
+@router.post("/pipelines/{pipeline_id}/start")
+def start_pipeline(pipeline_id: str, request: StartRequest):
+    return _start_pipeline(pipeline_id, request)
+
+
+@router.post("/pipelines/{pipeline_id}/stop")
+def stop_pipeline(pipeline_id: str):
+    return _stop_pipeline(pipeline_id)
+
+
+@router.get("/pipelines/{pipeline_id}/status")
+async def pipeline_status(pipeline_id: str):
+    status = pipeline_manager.status(pipeline_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No pipeline '{pipeline_id}'.")
+    return status
+
+
+@router.get("/pipelines/{pipeline_id}/attendance")
+async def pipeline_attendance(pipeline_id: str):
+    session = pipeline_manager.get(pipeline_id)
+    if not session:
+        raise HTTPException(status_code=404, detail=f"No pipeline '{pipeline_id}'.")
+    return session.pipeline.get_attendance() if session.pipeline else {}
+
+
+@router.get("/pipelines/{pipeline_id}/stream")
+async def pipeline_stream(pipeline_id: str):
+    if not pipeline_manager.get(pipeline_id):
+        raise HTTPException(status_code=404, detail=f"No pipeline '{pipeline_id}'.")
+    return StreamingResponse(stream_generator(pipeline_id), media_type="multipart/x-mixed-replace; boundary=frame")
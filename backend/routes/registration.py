@@ -4,23 +4,19 @@ import cv2
 import numpy as np
 import logging
 from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List
 
 from .. import database_handler
 from .. import auth
-from ..adaface_model import AdaFaceModel  # NEW: Import our AdaFace wrapper
+from ..model_registry import model_registry
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 PHOTOS_BASE_FOLDER = os.path.join(PROJECT_ROOT, "data", "captured_faces")
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# --- NEW: Initialize AdaFace Model ---
-# Assumes a 'models' folder in your project root
-ADAFAFE_MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "adaface_ir101_webface12m.ckpt")
-adaface = AdaFaceModel(ADAFAFE_MODEL_PATH)
-
 # Configuration
 REQUIRED_PHOTOS = 5  # 2 HQ + 3 degraded
 
@@ -33,6 +29,22 @@ class BatchRegistrationRequest(BaseModel):
 
 
 # --- Internal Processing Function ---
+def _embed_student_photos(adaface, photo_sets):
+    """
+    Embeds the photos of several students in one get_embeddings call, so forward passes fill
+    up to ADAFACE_BATCH_SIZE across students. Returns each student's valid embeddings.
+    """
+    crops, owners = [], []
+    for owner, images in enumerate(photo_sets):
+        crops.extend(images)
+        owners.extend([owner] * len(images))
+    per_student = [[] for _ in photo_sets]
+    for owner, embedding in zip(owners, adaface.get_embeddings(crops) if crops else []):
+        if embedding is not None:
+            per_student[owner].append(embedding)
+    return per_student
+
+
 def _process_batch_registration(student_class: str, department: str, clear_db: bool):
     """Processes folders and registers students using 5-image AdaFace strategy."""
     if not os.path.isdir(PHOTOS_BASE_FOLDER):
@@ -43,7 +55,32 @@ def _process_batch_registration(student_class: str, department: str, clear_db: b
         database_handler.recreate_students_table()
 
     student_folders = [f for f in os.listdir(PHOTOS_BASE_FOLDER) if os.path.isdir(os.path.join(PHOTOS_BASE_FOLDER, f))]
-    registered_students, failed_folders = [], []
+    registered_students, failed_folders, new_students = [], [], []
+    # AdaFace loads on first use and is shared with every other caller in this process
+    adaface = model_registry.get("adaface")
+    # Students whose photos are read but not embedded yet: (folder_name, roll_no, name, parent_phone, images)
+    pending = []
+
+    def embed_pending():
+        try:
+            student_embeddings = _embed_student_photos(adaface, [student[4] for student in pending])
+        except Exception as e:
+            logger.error(f"Failed to process photos for {', '.join(student[2] for student in pending)}: {e}")
+            student_embeddings = [[] for _ in pending]
+        for (folder_name, roll_no, name, parent_phone, _), embeddings in zip(pending, student_embeddings):
+            if embeddings:
+                # Compute master embedding (average + L2 normalization)
+                master_embedding = np.mean(embeddings, axis=0)
+                norm = np.linalg.norm(master_embedding)
+                if norm > 0:
+                    master_embedding = master_embedding / norm
+                
+                # Written together after the loop: one transaction and one embedding store update
+                new_students.append((roll_no, name, student_class, master_embedding, parent_phone, department))
+                registered_students.append({"roll_no": roll_no, "name": name, "photos": len(embeddings)})
+            else:
+                failed_folders.append(f"{folder_name} (no valid embeddings)")
+        pending.clear()
 
     for folder_name in student_folders:
         try:
@@ -71,41 +108,23 @@ def _process_batch_registration(student_class: str, department: str, clear_db: b
         
         photo_files = photo_files[:REQUIRED_PHOTOS]
 
-        embeddings = []
+        images = []
         for photo in photo_files:
-            try:
-                img_path = os.path.join(PHOTOS_BASE_FOLDER, folder_name, photo)
-                img = cv2.imread(img_path)
-                if img is None:
-                    logger.error(f"Could not read image: {photo}")
-                    continue
-                
-                # Generate embedding using AdaFace
-                embedding = adaface.get_embedding(img)
-                if embedding is not None:
-                    embeddings.append(embedding)
-                
-            except Exception as e:
-                logger.error(f"Failed to process '{photo}' for {name}: {e}")
+            img_path = os.path.join(PHOTOS_BASE_FOLDER, folder_name, photo)
+            img = cv2.imread(img_path)
+            if img is None:
+                logger.error(f"Could not read image: {photo}")
+                continue
+            images.append(img)
         
-        if embeddings:
-            # Compute master embedding (average + L2 normalization)
-            master_embedding = np.mean(embeddings, axis=0)
-            norm = np.linalg.norm(master_embedding)
-            if norm > 0:
-                master_embedding = master_embedding / norm
-            
-            # CRITICAL: Your database_handler.add_student must now save the embedding
-            # to the new 'adaface_embedding' column in your database.
-            database_handler.add_student(
-                roll_no, name, student_class, master_embedding, 
-                parent_phone_number=parent_phone, 
-                department=department
-            )
-            registered_students.append({"roll_no": roll_no, "name": name, "photos": len(embeddings)})
-        else:
-            failed_folders.append(f"{folder_name} (no valid embeddings)")
-
+        # Photos from several students share each batched forward pass
+        pending.append((folder_name, roll_no, name, parent_phone, images))
+        if sum(len(student[4]) for student in pending) >= adaface.batch_size:
+            embed_pending()
+
+    if pending:
+        embed_pending()
+    database_handler.add_students(new_students)
     return registered_students, failed_folders
 
 
@@ -117,7 +136,9 @@ async def run_batch_registration_endpoint(request: BatchRegistrationRequest):
     Runs batch registration for students. Uses NEW 5-image AdaFace strategy.
     """
     try:
-        registered, failed = _process_batch_registration(
+        # Model loading and inference block, so they run off the event loop
+        registered, failed = await run_in_threadpool(
+            _process_batch_registration,
             request.student_class, 
             request.department,
             request.clear_existing_students
@@ -155,23 +176,29 @@ async def register_single_student(
             detail=f"Exactly {REQUIRED_PHOTOS} face photos are required. Got {len(photos)}."
         )
 
-    embeddings = []
+    images = []
     for photo in photos:
         try:
             contents = await photo.read()
             nparr = np.frombuffer(contents, np.uint8)
             img_np = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if img_np is None:
-                raise HTTPException(status_code=400, detail=f"Could not decode image: {photo.filename}")
-            
-            # Generate embedding using AdaFace
-            embedding = adaface.get_embedding(img_np)
-            if embedding is not None:
-                embeddings.append(embedding)
-            
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Could not process image: {photo.filename}. Error: {str(e)}")
+        if img_np is None:
+            raise HTTPException(status_code=400, detail=f"Could not decode image: {photo.filename}")
+        images.append(img_np)
+
+    # Generate all AdaFace embeddings in one batched forward pass. The first call also loads
+    # the model; both block, so they run on the threadpool instead of the event loop
+    try:
+        adaface = await run_in_threadpool(model_registry.get, "adaface")
+    except Exception as e:
+        logger.error(f"AdaFace could not be loaded: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail=f"Face recognition model is unavailable. Error: {str(e)}")
+    try:
+        embeddings = await run_in_threadpool(lambda: [e for e in adaface.get_embeddings(images) if e is not None])
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not process images. Error: {str(e)}")
 
     if embeddings:
         # Compute master embedding (average + L2 normalization)
@@ -180,8 +207,9 @@ async def register_single_student(
         if norm > 0:
             master_embedding = master_embedding / norm
         
-        # CRITICAL: Update database_handler to save to 'adaface_embedding' column
-        database_handler.add_student(
+        # The SQLite write and the embedding store update block too
+        await run_in_threadpool(
+            database_handler.add_student,
             roll_no=roll_no, name=name, student_class=student_class,
             embedding=master_embedding, parent_phone_number=parent_phone,
             department=user_dept
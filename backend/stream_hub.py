@@ -0,0 +1,109 @@
+# backend/stream_hub.py (Encode-once MJPEG fan-out for the live stream endpoints)
+import asyncio
+import threading
+import cv2
+
+
+def encode_chunk(frame):
+    """One multipart/x-mixed-replace part for the frame, or None if encoding failed."""
+    (flag, encodedImage) = cv2.imencode(".jpg", frame)
+    if not flag:
+        return None
+    return b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + encodedImage.tobytes() + b'\r\n'
+
+
+class MJPEGBroadcaster:
+    """
+    Encodes each published frame once and shares the resulting chunk with every
+    stream client. Only the newest chunk is kept: a slow client skips straight to
+    it instead of holding up the pipeline or the other viewers. While nobody is
+    watching, publish() returns without encoding at all.
+
+    Clients are coroutines. publish() runs on the pipeline thread and wakes each
+    event loop with clients once, through loop.call_soon_threadsafe, so a viewer
+    costs a coroutine rather than a threadpool worker.
+    """
+
+    def __init__(self):
+        self.chunk = None
+        self.seq = 0
+        self.subscribers = 0
+        self.frames_encoded = 0
+        self.frames_unwatched = 0
+        self.closed = False
+        self._lock = threading.Lock()
+        self._wakeups = {}  # event loop -> asyncio.Event its clients wait on; replaced on every wake
+        self._loop_subscribers = {}  # event loop -> clients streaming on it; the loop is dropped at zero
+
+    def publish(self, frame):
+        if not self.subscribers:
+            self.frames_unwatched += 1
+            return
+        chunk = encode_chunk(frame)
+        if chunk is None:
+            return
+        with self._lock:
+            self.chunk = chunk
+            self.seq += 1
+            self.frames_encoded += 1
+        self._wake_all()
+
+    def close(self):
+        """Ends every client's stream once it has sent the last chunk."""
+        with self._lock:
+            self.closed = True
+        self._wake_all()
+
+    def _wake_all(self):
+        with self._lock:
+            loops = list(self._wakeups)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                pass  # The loop has shut down; its clients are gone with it
+
+    def _wake(self, loop):
+        # Runs on `loop`. Clients that read an older seq are waiting on this event
+        with self._lock:
+            event = self._wakeups.get(loop)
+            if event is None:
+                return  # Its last client left after the wake was scheduled
+            self._wakeups[loop] = asyncio.Event()
+        event.set()
+
+    async def stream(self):
+        """Yields chunks for one client until the broadcaster closes; frames published in between are skipped."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.subscribers += 1
+            self._loop_subscribers[loop] = self._loop_subscribers.get(loop, 0) + 1
+            self._wakeups.setdefault(loop, asyncio.Event())
+        cursor = 0
+        try:
+            while True:
+                # Take the event before reading seq: a publish after the read then always sets it
+                with self._lock:
+                    event = self._wakeups[loop]
+                    seq, chunk, closed = self.seq, self.chunk, self.closed
+                if seq != cursor and chunk is not None:
+                    cursor = seq
+                    yield chunk
+                elif closed:
+                    return
+                else:
+                    await event.wait()
+        finally:
+            with self._lock:
+                self.subscribers -= 1
+                self._loop_subscribers[loop] -= 1
+                if not self._loop_subscribers[loop]:
+                    # Holding on would keep a closed loop alive and wake it on every publish
+                    del self._loop_subscribers[loop], self._wakeups[loop]
+
+    def stats(self):
+        return {
+            "subscribers": self.subscribers,
+            "frames_encoded": self.frames_encoded,
+            "frames_unwatched": self.frames_unwatched,
+        }
@@ -15,6 +15,7 @@ from deepface import DeepFace
 from bytetracker import BYTETracker
 from torchvision.ops import nms
 import backend.database_handler as database_handler
+from backend.best_shot import get_image_sharpness
 
 # --- (I) ADVANCED LOGGING SETUP ---
 log_format = '%(asctime)s - %(levelname)s - [%(module)s:%(lineno)d] - %(message)s'
@@ -53,12 +54,6 @@ class Config:
         os.makedirs("debug/restored", exist_ok=True)
         os.makedirs("debug/failed_crops", exist_ok=True)
 
-# --- HELPER FUNCTIONS ---
-def get_image_sharpness(image):
-    if image is None or image.size == 0: return 0
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    return cv2.Laplacian(gray, cv2.CV_64F).var()
-
 class AdvancedPipeline:
     def __init__(self, config):
         self.config = config
@@ -0,0 +1,76 @@
+# backend/tests/test_embedding_store.py
+import numpy as np
+import pytest
+
+from backend.embedding_store import EmbeddingStore
+
+DIM = 8
+
+
+def vector(seed):
+    return np.random.default_rng(seed).standard_normal(DIM)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.rebuild([("a", "Asha", "TE", "CS", vector(0)), ("b", "Bilal", "TE", "IT", vector(1))])
+    return store
+
+
+def test_load_returns_normalised_memmap(store):
+    snapshot = store.load()
+    assert snapshot.roll_nos == ["a", "b"]
+    assert isinstance(snapshot.matrix, np.memmap)
+    assert np.allclose(np.linalg.norm(snapshot.matrix, axis=1), 1.0)
+    assert snapshot.students["b"] == {"name": "Bilal", "student_class": "TE", "department": "IT"}
+    assert snapshot.model == "AdaFace"
+
+
+def test_upsert_overwrites_in_place_and_appends(store):
+    before = store.load()
+    store.upsert("a", vector(2), "Asha K", "BE", "CS")
+    store.upsert("c", vector(3), "Chen", "TE", "CS")
+
+    snapshot = store.load()
+    assert snapshot.roll_nos == ["a", "b", "c"]
+    assert snapshot.students["a"]["name"] == "Asha K"
+    assert np.allclose(snapshot.matrix[0], vector(2) / np.linalg.norm(vector(2)), atol=1e-6)
+    # A mapping opened before the change sees the in-place overwrite, not a stale copy
+    assert np.allclose(before.matrix[0], snapshot.matrix[0])
+
+
+def test_upsert_many_keeps_the_last_row_per_roll_no(store):
+    store.upsert_many([("c", vector(4), "Chen", "TE", "CS"), ("b", vector(5), "Bilal", "TE", "IT"),
+                       ("c", vector(6), "Chen W", "TE", "CS")])
+
+    snapshot = store.load()
+    assert snapshot.roll_nos == ["a", "b", "c"]
+    assert snapshot.students["c"]["name"] == "Chen W"
+    assert np.allclose(snapshot.matrix[2], vector(6) / np.linalg.norm(vector(6)), atol=1e-6)
+
+
+def test_delete_compacts_rows(store):
+    store.upsert("c", vector(3), "Chen", "TE", "CS")
+    store.delete("b")
+    store.delete("missing")
+
+    snapshot = store.load()
+    assert snapshot.roll_nos == ["a", "c"]
+    assert np.allclose(snapshot.matrix[1], vector(3) / np.linalg.norm(vector(3)), atol=1e-6)
+
+
+def test_store_for_another_model_or_dim_is_rejected(store, tmp_path):
+    assert EmbeddingStore(str(tmp_path), model="ArcFace").load() is None
+    with pytest.raises(RuntimeError):
+        store.upsert("c", np.ones(DIM + 1), "Chen", "TE", "CS")
+
+
+def test_interrupted_append_is_truncated(store):
+    with open(store.data_file, "ab") as f:
+        f.write(b"\0" * 5)  # Half a row left behind by a crash
+    store.upsert("c", vector(3), "Chen", "TE", "CS")
+
+    snapshot = store.load()
+    assert snapshot.roll_nos == ["a", "b", "c"]
+    assert np.allclose(snapshot.matrix[2], vector(3) / np.linalg.norm(vector(3)), atol=1e-6)
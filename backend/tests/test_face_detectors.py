@@ -0,0 +1,70 @@
+# backend/tests/test_face_detectors.py
+import numpy as np
+
+from backend.face_detectors import FaceDetector, TiledFaceDetector, tile_grid
+
+
+class ScriptedDetector(FaceDetector):
+    """Returns the given frame-coordinate boxes, translated into each crop it is handed."""
+
+    name = "scripted"
+
+    def __init__(self, boxes):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 5)
+        self.crops = []
+
+    def detect_batch(self, frames):
+        results = []
+        for frame in frames:
+            # Crops are views into the parent frame, so their offset can be recovered from the pointer
+            offset = (frame.__array_interface__["data"][0] - self.parent.__array_interface__["data"][0]) // 3
+            y, x = divmod(offset, self.parent.shape[1])
+            height, width = frame.shape[:2]
+            self.crops.append((x, y, x + width, y + height))
+            boxes = self.boxes.copy()
+            boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]] - x, 0, width)
+            boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]] - y, 0, height)
+            visible = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+            results.append(np.hstack([boxes[visible], np.zeros((visible.sum(), 1), dtype=np.float32)]))
+        return results
+
+
+def detect(boxes, rows=2, cols=2, roi_mask=None, size=(200, 300)):
+    frame = np.zeros((*size, 3), dtype=np.uint8)
+    detector = ScriptedDetector(boxes)
+    detector.parent = frame
+    tiled = TiledFaceDetector(detector, rows=rows, cols=cols, overlap=0.2, roi_mask=roi_mask)
+    return tiled.detect_batch([frame])[0], detector.crops
+
+
+def test_tile_grid_covers_frame_with_overlap():
+    tiles = tile_grid(200, 300, 2, 2, 0.2)
+    assert len(tiles) == 4
+    assert tiles[0][:2] == (0, 0) and tiles[-1][2:] == (300, 200)
+    assert tiles[0][2] > tiles[1][0]  # Neighbours overlap
+
+
+def test_duplicate_boxes_across_tiles_are_merged():
+    # Inside the overlap, so two tiles and the whole-frame pass all see it whole
+    detections, _ = detect([[140, 20, 160, 40, 0.9]])
+    assert len(detections) == 1
+    assert np.allclose(detections[0, :4], [140, 20, 160, 40])
+
+
+def test_boxes_cut_by_inner_tile_edges_are_dropped():
+    # Crosses the right edge of the top-left tile; only the full views of it survive
+    detections, crops = detect([[160, 150, 180, 170, 0.9]], rows=1, cols=2)
+    assert len(detections) == 1
+    assert np.allclose(detections[0, :4], [160, 150, 180, 170])
+    # Boxes at the frame border are kept even though they touch a tile edge
+    detections, _ = detect([[0, 0, 20, 20, 0.8]], rows=1, cols=2)
+    assert len(detections) == 1
+
+
+def test_roi_mask_confines_passes_and_filters_boxes():
+    mask = np.zeros((200, 300), dtype=bool)
+    mask[100:200, 0:150] = True
+    detections, crops = detect([[20, 120, 40, 140, 0.9], [250, 20, 270, 40, 0.9]], rows=1, cols=1, roi_mask=mask)
+    # One pass over the mask's bounding box instead of the whole frame
+    assert crops == [(0, 100, 150, 200)]
+    assert len(detections) == 1 and np.allclose(detections[0, :4], [20, 120, 40, 140])
@@ -0,0 +1,63 @@
+# backend/tests/test_frame_ring.py
+import numpy as np
+import pytest
+
+from backend.frame_ring import SharedFrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing.create(slots=4, slot_bytes=16 * 16 * 3)
+    yield ring
+    ring.close()
+
+
+def frame(value, shape=(16, 16, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_view_returns_the_written_frame(ring):
+    seq = ring.write(frame(7))
+    view = ring.view(seq)
+    assert view.shape == (16, 16, 3) and np.all(view == 7)
+    assert not view.flags.writeable
+    assert ring.write(frame(1, (16, 16))) == seq + 1
+    assert ring.view(seq + 1).shape == (16, 16)
+
+
+def test_oversized_frames_are_refused(ring):
+    assert ring.write(frame(1, (32, 32, 3))) is None
+    assert ring.write(np.zeros((4, 4), dtype=np.float32)) is None
+
+
+def test_lapped_frame_is_detected(ring):
+    seq = ring.write(frame(1))
+    view = ring.view(seq)
+    assert ring.is_current(seq)
+    for value in range(2, 6):  # One full lap of the four slots
+        ring.write(frame(value))
+    assert not ring.is_current(seq)
+    assert ring.view(seq) is None
+    # The old view now shows the newer frame, which is why readers must re-check is_current
+    assert np.all(view == 5)
+
+
+def test_reader_skips_to_newest_and_counts_missed(ring):
+    reader = ring.reader()
+    assert reader.next() is None
+    for value in range(1, 4):
+        ring.write(frame(value))
+    seq, view = reader.next()
+    assert seq == 3 and np.all(view == 3)
+    assert reader.missed == 2
+    assert reader.next() is None
+
+
+def test_attached_ring_sees_producer_frames(ring):
+    other = SharedFrameRing.attach(ring.name)
+    try:
+        seq = ring.write(frame(9))
+        assert np.all(other.view(seq) == 9)
+        assert other.latest_seq() == seq
+    finally:
+        other.close()
@@ -0,0 +1,134 @@
+# backend/tests/test_gallery.py
+import numpy as np
+import pytest
+
+from backend.embedding_store import EmbeddingStore
+from backend.gallery import INDEX_TYPES, EmbeddingGallery, l2_normalize
+
+DIM = 64
+
+
+def make_gallery(index, count=200, seed=0):
+    vectors = l2_normalize(np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32))
+    roll_nos = [f"r{i}" for i in range(count)]
+    student_db = {roll_no: {"student_class": "TE", "department": "CS"} for roll_no in roll_nos}
+    # Probing every IVF cell makes the approximate index exact, so all indexes must agree
+    gallery = EmbeddingGallery.from_arrays(roll_nos, vectors, student_db, index=index, n_probe=1000, rerank=32)
+    return gallery, vectors
+
+
+@pytest.mark.parametrize("index", INDEX_TYPES)
+def test_search_finds_each_row(index):
+    gallery, vectors = make_gallery(index)
+    roll_nos, distances = gallery.search(vectors[::10], k=2)
+    assert list(roll_nos[:, 0]) == [f"r{i}" for i in range(0, 200, 10)]
+    assert np.all(distances[:, 0] < 1e-2)
+    assert np.all(distances[:, 1] >= distances[:, 0])
+
+
+@pytest.mark.parametrize("index", INDEX_TYPES)
+def test_upsert_adds_and_replaces(index):
+    gallery, vectors = make_gallery(index)
+    rng = np.random.default_rng(1)
+    new, replacement = rng.standard_normal((2, DIM)).astype(np.float32)
+
+    gallery.upsert("new", new, "TE", "CS")
+    gallery.upsert("r5", replacement, "BE", "CS")
+
+    assert len(gallery) == 201
+    assert gallery.match(new)[0] == "new"
+    assert gallery.match(replacement)[0] == "r5"
+    # Untouched rows still match themselves
+    assert gallery.match(vectors[7])[0] == "r7"
+    assert gallery.shard("BE").roll_nos.tolist() == ["r5"]
+
+
+@pytest.mark.parametrize("index", INDEX_TYPES)
+def test_remove_drops_only_that_student(index):
+    gallery, vectors = make_gallery(index)
+    gallery.remove("r3")
+    gallery.remove("missing")
+
+    assert len(gallery) == 199
+    assert "r3" not in gallery.search(vectors[3], k=5)[0][0]
+    assert gallery.match(vectors[4])[0] == "r4"
+    assert gallery.match(vectors[199])[0] == "r199"
+
+
+def test_search_pads_beyond_gallery_size():
+    gallery, vectors = make_gallery("exact", count=2)
+    roll_nos, distances = gallery.search(vectors[0], k=3)
+    assert roll_nos[0, 2] is None and np.isinf(distances[0, 2])
+
+
+def test_store_backed_gallery_remaps_instead_of_copying(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    rng = np.random.default_rng(2)
+    store.rebuild([(f"r{i}", f"S{i}", "TE", "CS", rng.standard_normal(DIM)) for i in range(10)])
+    snapshot = store.load()
+    gallery = EmbeddingGallery.from_arrays(snapshot.roll_nos, snapshot.matrix, snapshot.students, store=store)
+
+    new = rng.standard_normal(DIM)
+    store.upsert("r10", new, "S10", "TE", "CS")
+    gallery.upsert("r10", new, "TE", "CS")
+    store.delete("r2")
+    gallery.remove("r2")
+
+    assert isinstance(gallery.matrix, np.memmap) and gallery._buffer is None
+    assert gallery.match(new)[0] == "r10"
+    assert "r2" not in gallery.roll_nos
+
+
+
+@pytest.mark.parametrize("index", INDEX_TYPES)
+def test_apply_changes_applies_a_whole_change_set(index):
+    gallery, vectors = make_gallery(index)
+    rng = np.random.default_rng(4)
+    first, second, replacement = rng.standard_normal((3, DIM)).astype(np.float32)
+
+    gallery.apply_changes({"new1": (first, "TE", "CS"), "new2": (second, "TE", "CS"),
+                           "r5": (replacement, "BE", "CS")}, ["r3", "r150", "missing"])
+
+    assert len(gallery) == 200
+    assert gallery.match(first)[0] == "new1" and gallery.match(second)[0] == "new2"
+    assert gallery.match(replacement)[0] == "r5"
+    assert "r3" not in gallery.roll_nos and "r150" not in gallery.roll_nos
+    assert gallery.match(vectors[199])[0] == "r199"
+
+
+def test_store_backed_gallery_remaps_a_multi_row_change_once(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    rng = np.random.default_rng(5)
+    store.rebuild([(f"r{i}", f"S{i}", "TE", "CS", rng.standard_normal(DIM)) for i in range(10)])
+    snapshot = store.load()
+    gallery = EmbeddingGallery.from_arrays(snapshot.roll_nos, snapshot.matrix, snapshot.students, store=store)
+
+    new = {f"r{i}": rng.standard_normal(DIM) for i in range(10, 14)}
+    replacement = rng.standard_normal(DIM)
+    store.upsert_many([(roll_no, vector, roll_no, "TE", "CS") for roll_no, vector in new.items()]
+                      + [("r1", replacement, "S1", "TE", "CS")])
+    store.delete("r2")
+    # Set order differs from the order the store appended the rows in
+    gallery.apply_changes({roll_no: (new[roll_no], "TE", "CS") for roll_no in reversed(list(new))}
+                          | {"r1": (replacement, "TE", "CS")}, ["r2"])
+
+    assert isinstance(gallery.matrix, np.memmap) and gallery._buffer is None
+    assert list(gallery.roll_nos) == store.load().roll_nos
+    assert all(gallery.match(vector)[0] == roll_no for roll_no, vector in new.items())
+    assert gallery.match(replacement)[0] == "r1"
+
+
+def test_gallery_out_of_step_with_store_copies_rows(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    rng = np.random.default_rng(3)
+    store.rebuild([(f"r{i}", f"S{i}", "TE", "CS", rng.standard_normal(DIM)) for i in range(4)])
+    snapshot = store.load()
+    gallery = EmbeddingGallery.from_arrays(snapshot.roll_nos, snapshot.matrix, snapshot.students, store=store)
+
+    # The store never saw this row, so the gallery falls back to its own buffer
+    new = rng.standard_normal(DIM)
+    gallery.upsert("r4", new, "TE", "CS")
+
+    assert not isinstance(gallery.matrix, np.memmap)
+    assert gallery.match(new)[0] == "r4"
+    assert gallery.match(snapshot.matrix[1])[0] == "r1"
@@ -0,0 +1,110 @@
+# backend/tests/test_pipeline_manager.py
+import threading
+import time
+
+import pytest
+
+from backend import pipeline_manager
+from backend.pipeline_manager import PipelineCapacityError, PipelineManager
+
+
+class FakePipeline:
+    """Stands in for VerificationPipeline: yields frames until its stop event is set."""
+
+    fail_init = False
+    raise_init = False
+
+    def __init__(self, stop_event, current_lecture=None, video_source=None):
+        if self.raise_init:
+            raise OSError("no shared memory")
+        self.stop_event = stop_event
+        self.video_source = video_source
+        self.is_initialized = not self.fail_init
+
+    def run(self):
+        while not self.stop_event.is_set():
+            yield None
+            time.sleep(0.01)
+
+    def get_attendance(self):
+        return {"r1": {}}
+
+    def get_stats(self):
+        return {}
+
+
+@pytest.fixture
+def manager_factory(monkeypatch):
+    monkeypatch.setitem(pipeline_manager.EXECUTION_MODES, "fake", FakePipeline)
+    managers = []
+
+    def factory(**kwargs):
+        manager = PipelineManager(execution="fake", **kwargs)
+        managers.append(manager)
+        return manager
+
+    yield factory
+    for manager in managers:
+        for pipeline_id in list(manager.sessions):
+            manager.stop(pipeline_id)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.01)
+
+
+def test_reject_policy_enforces_the_cap(manager_factory):
+    manager = manager_factory(max_pipelines=1, overflow="reject")
+    manager.start("hall-1")
+    with pytest.raises(PipelineCapacityError):
+        manager.start("hall-2")
+    with pytest.raises(ValueError):
+        manager.start("hall-1")
+    assert manager.running == 1
+
+
+def test_queued_pipeline_starts_when_a_slot_frees(manager_factory):
+    manager = manager_factory(max_pipelines=1, overflow="queue")
+    manager.start("hall-1")
+    queued = manager.start("hall-2")
+    assert queued.state == "queued"
+
+    assert manager.stop("hall-1") == {"r1": {}}
+    wait_for(lambda: queued.state == "running")
+    assert manager.running == 1
+
+
+def test_stopping_a_queued_pipeline_never_takes_a_slot(manager_factory):
+    manager = manager_factory(max_pipelines=1, overflow="queue")
+    manager.start("hall-1")
+    queued = manager.start("hall-2")
+    manager.stop("hall-2")
+    queued.thread.join(timeout=5)
+    assert not queued.thread.is_alive()
+    assert manager.running == 1
+
+
+@pytest.mark.parametrize("failure", ["fail_init", "raise_init"])
+def test_failed_start_releases_its_slot(manager_factory, monkeypatch, failure):
+    monkeypatch.setattr(FakePipeline, failure, True)
+    manager = manager_factory(max_pipelines=1, overflow="reject")
+    for attempt in range(3):
+        with pytest.raises(RuntimeError):
+            manager.start(f"hall-{attempt}")
+    assert manager.running == 0
+    assert manager.status("hall-0")["state"] == "failed"
+
+
+def test_failed_queued_start_releases_its_slot(manager_factory, monkeypatch):
+    manager = manager_factory(max_pipelines=1, overflow="queue")
+    manager.start("hall-1")
+    monkeypatch.setattr(FakePipeline, "raise_init", True)
+    queued = manager.start("hall-2")
+    manager.stop("hall-1")
+
+    wait_for(lambda: queued.state == "failed")
+    assert queued.error == "no shared memory"
+    wait_for(lambda: manager.running == 0)
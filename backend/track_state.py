@@ -0,0 +1,65 @@
+# backend/track_state.py (Compact per-track identity state)
+import numpy as np
+
+from backend.best_shot import BestShotBuffer
+
+
+class TrackState:
+    """
+    Identity state of one tracker ID. Slotted, with the running embedding kept as a
+    single float32 sum vector, so a long lecture with many tracks stays small.
+
+    Every recognition attempt folds one embedding into the running mean, which is what
+    gets matched against the gallery. A student is confirmed only after enough matches
+    to the same roll number inside the confirmation window; `best_shots` is None once
+    the track needs no further attempts (confirmed, or out of its embedding budget).
+    `crops_embedded` counts every crop run through the model for the track, which is
+    what the per-track cap bounds.
+    """
+
+    __slots__ = ("embedding_sum", "embedding_count", "candidate", "hits", "window_start", "roll_no", "best_shots",
+                 "crops_embedded")
+
+    def __init__(self, best_shot_k=3):
+        self.embedding_sum = None
+        self.embedding_count = 0
+        self.candidate = None  # Roll number the running mean currently matches
+        self.hits = 0
+        self.window_start = 0.0
+        self.roll_no = None  # Set once the identity is confirmed
+        self.best_shots = BestShotBuffer(best_shot_k)
+        self.crops_embedded = 0
+
+    @property
+    def needs_recognition(self):
+        return self.best_shots is not None
+
+    def add_embedding(self, embedding):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self.embedding_sum is None:
+            self.embedding_sum = np.zeros_like(embedding)
+        self.embedding_sum += embedding
+        self.embedding_count += 1
+
+    def mean_embedding(self):
+        return self.embedding_sum / self.embedding_count
+
+    def record_match(self, roll_no, now, hits_needed, window_seconds):
+        """Counts one match; True once `hits_needed` matches to the same student fall inside the window."""
+        if roll_no != self.candidate or now - self.window_start > window_seconds:
+            self.candidate, self.hits, self.window_start = roll_no, 0, now
+        if roll_no is None:
+            return False
+        self.hits += 1
+        return self.hits >= hits_needed
+
+    def restart_matching(self, best_shot_k):
+        """
+        Forgets the matches counted against a roster that has since changed. Crops still
+        buffered and the running embedding are kept; a track that had stopped trying
+        gets a fresh buffer and budget, like a newly seen face.
+        """
+        self.candidate, self.hits, self.window_start = None, 0, 0.0
+        if self.best_shots is None:
+            self.best_shots = BestShotBuffer(best_shot_k)
+            self.crops_embedded = 0
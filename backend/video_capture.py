@@ -0,0 +1,108 @@
+# backend/video_capture.py (Threaded frame capture decoupled from inference)
+import collections
+import logging
+import threading
+import cv2
+
+logger = logging.getLogger(__name__)
+
+LIVE_PREFIXES = ("rtsp://", "rtmp://", "http://", "https://", "/dev/video")
+
+
+def is_live_source(source):
+    """Cameras and network streams run in real time; files can be read at any pace."""
+    return isinstance(source, int) or str(source).startswith(LIVE_PREFIXES)
+
+
+class ThreadedCapture:
+    """
+    Reads frames on a dedicated thread into a bounded ring buffer so a slow
+    detector never stalls the camera.
+
+    With drop_frames=True (live sources) the consumer always gets the freshest
+    frame and anything older is discarded and counted in `dropped_frames`, so
+    end-to-end latency stays bounded under load. With drop_frames=False (files)
+    the producer waits for space instead and every frame is delivered in order.
+
+    `should_decode(frame_index)` picks the frames worth decoding; the rest are only
+    grab()bed, which advances the stream without paying for the decode.
+    """
+
+    def __init__(self, source, buffer_size=2, drop_frames=None, should_decode=None):
+        self.source = source
+        self.drop_frames = is_live_source(source) if drop_frames is None else drop_frames
+        self.capture = cv2.VideoCapture(source)
+        self.should_decode = should_decode
+        # Holds (frame_index, frame) pairs; frame_index counts every frame the source produced
+        self.buffer = collections.deque(maxlen=max(1, buffer_size))
+        self.condition = threading.Condition()
+        self.frame_index = -1
+        self.grabbed_frames = 0
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.finished = False
+        self._stopped = False
+        self._thread = None
+        if self.capture.isOpened():
+            self._thread = threading.Thread(target=self._capture_loop, name="frame-capture", daemon=True)
+            self._thread.start()
+        else:
+            self.finished = True
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def _capture_loop(self):
+        while not self._stopped:
+            ret = self.capture.grab()
+            frame_index = self.grabbed_frames
+            self.grabbed_frames += 1
+            if ret:
+                if self.should_decode is not None and not self.should_decode(frame_index):
+                    continue
+                ret, frame = self.capture.retrieve()
+            with self.condition:
+                if not ret:
+                    self.finished = True
+                    self.condition.notify_all()
+                    return
+                if self.drop_frames:
+                    if len(self.buffer) == self.buffer.maxlen:
+                        # The deque evicts the oldest frame, which nobody will ever see
+                        self.dropped_frames += 1
+                else:
+                    while len(self.buffer) == self.buffer.maxlen and not self._stopped:
+                        self.condition.wait()
+                self.buffer.append((frame_index, frame))
+                self.captured_frames += 1
+                self.condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Returns (ret, frame) like cv2.VideoCapture.read. ret is False once the source
+        is exhausted; (True, None) means no new frame arrived within `timeout`.
+        The source position of the returned frame is left in `frame_index`.
+        """
+        with self.condition:
+            if not self.buffer and not self.finished and not self._stopped:
+                self.condition.wait(timeout)
+            if not self.buffer:
+                return (False, None) if self.finished or self._stopped else (True, None)
+            if self.drop_frames:
+                self.frame_index, frame = self.buffer.pop()
+                self.dropped_frames += len(self.buffer)
+                self.buffer.clear()
+            else:
+                self.frame_index, frame = self.buffer.popleft()
+            self.condition.notify_all()
+            return True, frame
+
+    def release(self):
+        with self.condition:
+            self._stopped = True
+            self.condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.capture.release()
+        logger.info(f"Capture of '{self.source}' released: {self.grabbed_frames} frames grabbed, "
+                    f"{self.captured_frames} decoded, {self.dropped_frames} dropped")